@@ -0,0 +1,344 @@
+# bench_ipraw.py
+# 목적: val QA 파일(질문 ↔ 원문 doc_id) 쌍으로 ipraw_db 검색 품질/지연시간 벤치마크
+# - 질의셋: unzip_data/ip/dataset/<kind>/qa/val/*.json 의 taskinfo.input → 정답 info.doc_id
+# - 대상: 라이브 컬렉션(기본) 또는 --replica 로 만든 인메모리 복제본
+# - 조합: 컬렉션 프로필 × hnsw_ef × 양자화 설정 × 배치 크기
+# - 출력: recall@k, MRR, p50/p95/p99 지연(ms), QPS → JSON (CI 회귀 비교용)
+#   · recall@k / mrr@k: 검색 결과를 doc_id 로 collapse 한 문서 순위 (같은 문서의 passage 가 top-k 를 채우지 않게)
+#   · raw_recall@k / raw_mrr@k: 포인트 순위 그대로 (비교용)
+#   · 복제본도 upsert_ipraw.iter_records 로 만들어 문서 + passage 포인트가 라이브와 같음
+#
+# 예) python qdrant/bench_ipraw.py --ef 64,128 --quant none,rescore --batch-size 1,16 --out bench.json
+#     python qdrant/bench_ipraw.py --replica --max-queries 500
+#     python qdrant/bench_ipraw.py --baseline bench_prev.json   # 회귀 시 exit 1
+
+from __future__ import annotations
+
+import os, sys, glob, json, time, random, argparse
+from collections import Counter
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple, Optional
+from dotenv import load_dotenv
+
+from clients import get_qdrant, get_embedder
+
+# 지표/회귀 비교는 tools/eval_router.py 와 공용 (tools/bench_stats.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+from bench_stats import latency_summary, drop_problem, increase_problem
+
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+    from embed_client import EmbedClient
+
+# ── env
+load_dotenv()
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+COLLECTION = os.getenv("COLLECTION", "ipraw_db")
+BASE_DIR = os.getenv("IPRAW_BASE", "unzip_data/ip/dataset")
+KINDS = ["judgment", "statute", "trial_decision", "decision", "interpretation"]
+
+# 양자화 검색 설정 이름 → QuantizationSearchParams 인자 (none = 서버 기본값)
+QUANT_PROFILES = {
+    "none": None,
+    "ignore": {"ignore": True},
+    "rescore": {"ignore": False, "rescore": True, "oversampling": 2.0},
+    "norescore": {"ignore": False, "rescore": False},
+}
+# 한 문서에 doc/passage 포인트가 여러 개 → 문서 단위 지표를 위해 k 의 몇 배를 가져올지
+OVERSAMPLE = 4
+
+# ── 질의셋
+
+def load_queries(base: str, max_queries: Optional[int] = None, seed: int = 42) -> List[Dict[str, Any]]:
+    """val QA 파일 → [{"query", "doc_id", "kind", "path"}]"""
+    queries = []
+    for kind in KINDS:
+        for fp in sorted(glob.glob(os.path.join(base, kind, "qa", "val", "*.json"))):
+            try:
+                with open(fp, encoding="utf-8") as f:
+                    doc = json.load(f)
+            except Exception as e:
+                print(f"[warn] load {fp}: {e}")
+                continue
+            info = doc.get("info", {}) or {}
+            task = doc.get("taskinfo", {}) or {}
+            q = (task.get("input") or "").strip()
+            doc_id = info.get("doc_id")
+            if not q or doc_id is None:
+                continue
+            queries.append({"query": q, "doc_id": str(doc_id), "kind": kind, "path": fp})
+    if max_queries and len(queries) > max_queries:
+        rnd = random.Random(seed)
+        queries = sorted(rnd.sample(queries, max_queries), key=lambda x: x["path"])
+    return queries
+
+
+def indexed_val_doc_ids(client: QdrantClient, collection: str) -> set:
+    """컬렉션에 실제 업서트된 val 문서의 doc_id 집합 (정답이 없는 질의는 제외하기 위함)."""
+    from qdrant_client.http.models import Filter, FieldCondition, MatchValue
+
+    ids = set()
+    flt = Filter(must=[FieldCondition(key="split", match=MatchValue(value="val"))])
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection, scroll_filter=flt, limit=1024,
+            offset=offset, with_payload=["doc_id"], with_vectors=False,
+        )
+        for p in points:
+            if p.payload and p.payload.get("doc_id") is not None:
+                ids.add(str(p.payload["doc_id"]))
+        if offset is None:
+            break
+    return ids
+
+
+def embed_all(embedder: EmbedClient, texts: List[str], batch_size: int = 64) -> List[List[float]]:
+    out: List[List[float]] = []
+    for i in range(0, len(texts), batch_size):
+        out.extend(embedder.embed(texts[i:i + batch_size]).tolist())
+    return out
+
+# ── 인메모리 복제본
+
+def build_replica(embedder: EmbedClient, base: str, collection: str) -> QdrantClient:
+    """val 파일(qa/summary)을 upsert_ipraw.iter_records 로 :memory: 컬렉션에 구성
+    → 라이브와 같은 문서/passage 포인트, id, 텍스트, payload."""
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import VectorParams, Distance, PointStruct
+    from upsert_ipraw import iter_records, batch
+
+    tasks = []
+    for kind in KINDS:
+        for sub in ("qa", "summary"):
+            for fp in sorted(glob.glob(os.path.join(base, kind, sub, "val", "*.json"))):
+                tasks.append((fp, kind, sub, "val"))
+    if not tasks:
+        raise SystemExit(f"[err] replica 대상 파일이 없습니다: {base}")
+
+    client = QdrantClient(":memory:")
+    created = False
+    n_points = Counter()
+    for rec_batch in batch(iter_records(tasks), 64):
+        vecs = embedder.embed([r[1] for r in rec_batch])
+        if not created:
+            client.create_collection(
+                collection_name=collection,
+                vectors_config=VectorParams(size=len(vecs[0]), distance=Distance.COSINE),
+            )
+            created = True
+        client.upsert(collection_name=collection, points=[
+            PointStruct(id=pid, vector=vec.tolist(), payload=payload)
+            for (pid, _, payload, _), vec in zip(rec_batch, vecs)
+        ])
+        n_points.update(r[2]["point_type"] for r in rec_batch)
+    print(f"[info] replica built: {sum(n_points.values())} points ({dict(n_points)})")
+    return client
+
+# ── 지표
+
+def score_ranking(ranked_doc_ids: List[str], gold: str, ks: List[int]) -> Tuple[Dict[int, int], float]:
+    """(k별 hit 여부, reciprocal rank) — 정답 doc_id 의 첫 등장 순위 기준."""
+    rank = None
+    for i, did in enumerate(ranked_doc_ids, 1):
+        if did == gold:
+            rank = i
+            break
+    hits = {k: int(rank is not None and rank <= k) for k in ks}
+    return hits, (1.0 / rank if rank else 0.0)
+
+
+def collapse_doc_ids(ranked_doc_ids: List[str]) -> List[str]:
+    """점수순 doc_id → 문서 단위 순위 (같은 문서의 qa/summary/passage 는 첫 히트만)."""
+    return list(dict.fromkeys(ranked_doc_ids))
+
+
+def run_profile(client: QdrantClient, collection: str, vectors: List[List[float]], golds: List[str],
+                ks: List[int], ef: Optional[int], quant: str, batch_size: int, warmup: int = 1,
+                oversample: int = OVERSAMPLE) -> Dict[str, Any]:
+    """지표 두 벌: recall@k / mrr@k = doc_id 로 collapse 한 문서 순위, raw_* = 포인트 순위 그대로."""
+    from qdrant_client.http.models import QueryRequest, SearchParams, QuantizationSearchParams
+
+    k_max = max(ks)
+    limit = k_max * max(1, oversample)   # collapse 후에도 k 개 문서가 남도록 과샘플
+    qp = QUANT_PROFILES[quant]
+    params = SearchParams(hnsw_ef=ef, quantization=QuantizationSearchParams(**qp) if qp else None)
+
+    def make_requests(vecs):
+        return [QueryRequest(query=v, limit=limit, params=params, with_payload=["doc_id"]) for v in vecs]
+
+    # 워밍업(캐시/커넥션) — 측정 제외
+    for _ in range(warmup):
+        client.query_batch_points(collection_name=collection, requests=make_requests(vectors[:batch_size]))
+
+    latencies_ms: List[float] = []
+    hit_sums = {k: 0 for k in ks}
+    raw_hit_sums = {k: 0 for k in ks}
+    rr_sum = raw_rr_sum = 0.0
+    t_start = time.perf_counter()
+    for i in range(0, len(vectors), batch_size):
+        reqs = make_requests(vectors[i:i + batch_size])
+        t0 = time.perf_counter()
+        responses = client.query_batch_points(collection_name=collection, requests=reqs)
+        dt_ms = (time.perf_counter() - t0) * 1000.0
+        # 배치 내 모든 질의는 배치 전체 지연을 체감한다
+        latencies_ms.extend([dt_ms] * len(reqs))
+        for resp, gold in zip(responses, golds[i:i + batch_size]):
+            ranked = [str((p.payload or {}).get("doc_id")) for p in resp.points]
+            hits, rr = score_ranking(collapse_doc_ids(ranked)[:k_max], gold, ks)
+            raw_hits, raw_rr = score_ranking(ranked[:k_max], gold, ks)
+            for k in ks:
+                hit_sums[k] += hits[k]
+                raw_hit_sums[k] += raw_hits[k]
+            rr_sum += rr
+            raw_rr_sum += raw_rr
+    elapsed = time.perf_counter() - t_start
+
+    n = len(vectors)
+    result = {
+        "collection": collection,
+        "ef": ef,
+        "quantization": quant,
+        "batch_size": batch_size,
+        "oversample": oversample,
+        "n_queries": n,
+    }
+    for k in ks:
+        result[f"recall@{k}"] = round(hit_sums[k] / n, 4) if n else 0.0
+    result[f"mrr@{k_max}"] = round(rr_sum / n, 4) if n else 0.0
+    for k in ks:
+        result[f"raw_recall@{k}"] = round(raw_hit_sums[k] / n, 4) if n else 0.0
+    result[f"raw_mrr@{k_max}"] = round(raw_rr_sum / n, 4) if n else 0.0
+    result["latency_ms"] = latency_summary(latencies_ms, ndigits=3)
+    result["qps"] = round(n / elapsed, 2) if elapsed > 0 else 0.0
+    return result
+
+# ── 회귀 비교
+
+def profile_key(r: Dict[str, Any]) -> Tuple:
+    return (r["collection"], r["ef"], r["quantization"], r["batch_size"])
+
+
+def compare_baseline(results: List[Dict[str, Any]], baseline_path: str,
+                     max_recall_drop: float, max_latency_increase: float) -> List[str]:
+    with open(baseline_path, encoding="utf-8") as f:
+        base = {profile_key(r): r for r in json.load(f).get("results", [])}
+    problems = []
+    for r in results:
+        b = base.get(profile_key(r))
+        if not b:
+            continue
+        for key, val in r.items():
+            if key.startswith(("recall@", "mrr@", "raw_recall@", "raw_mrr@")) and key in b:
+                problems.append(drop_problem(f"{profile_key(r)} {key}", b[key], val, max_recall_drop))
+        problems.append(increase_problem(f"{profile_key(r)} p95", b["latency_ms"]["p95"], r["latency_ms"]["p95"],
+                                         max_latency_increase))
+    return [p for p in problems if p]
+
+# ── 엔트리포인트
+
+def parse_int_list(s: str) -> List[int]:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def parse_ef_list(s: str) -> List[Optional[int]]:
+    # "default" 는 서버 기본 ef 사용
+    return [None if x.strip() == "default" else int(x) for x in s.split(",") if x.strip()]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="ipraw_db retrieval quality/latency benchmark")
+    ap.add_argument("--base", default=BASE_DIR, help="ip dataset 루트")
+    ap.add_argument("--collections", default=COLLECTION, help="쉼표 구분 컬렉션 프로필 목록")
+    ap.add_argument("--ef", default="default,64,128", help="hnsw_ef 목록 (default = 서버 기본)")
+    ap.add_argument("--quant", default="none", help=f"양자화 설정 목록: {','.join(QUANT_PROFILES)}")
+    ap.add_argument("--batch-size", default="1,16", help="질의 배치 크기 목록")
+    ap.add_argument("--k", default="1,5,10", help="recall@k 의 k 목록")
+    ap.add_argument("--oversample", type=int, default=OVERSAMPLE,
+                    help="검색 limit = max(k) × oversample (doc_id collapse 용)")
+    ap.add_argument("--max-queries", type=int, default=None, help="질의 수 상한 (고정 시드 샘플링)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--replica", action="store_true", help="라이브 대신 val 문서로 인메모리 복제본 구성")
+    ap.add_argument("--keep-missing", action="store_true", help="정답 문서가 컬렉션에 없는 질의도 포함")
+    ap.add_argument("--out", default=None, help="결과 JSON 경로 (미지정 시 stdout)")
+    ap.add_argument("--baseline", default=None, help="이전 결과 JSON; 회귀 시 exit 1")
+    ap.add_argument("--max-recall-drop", type=float, default=0.02)
+    ap.add_argument("--max-latency-increase", type=float, default=0.25, help="p95 허용 증가율")
+    args = ap.parse_args(argv)
+
+    for q in args.quant.split(","):
+        if q not in QUANT_PROFILES:
+            raise SystemExit(f"[err] unknown quantization profile: {q}")
+    collections = [c.strip() for c in args.collections.split(",") if c.strip()]
+    ks = sorted(set(parse_int_list(args.k)))
+
+    queries = load_queries(args.base, args.max_queries, args.seed)
+    if not queries:
+        raise SystemExit(f"[err] val QA 질의가 없습니다: {args.base}")
+    print(f"[info] loaded {len(queries)} val queries", file=sys.stderr)
+
+    embedder = get_embedder(None, timeout=30)
+    if not embedder.ping():
+        raise SystemExit(f"[err] 임베딩 서버 ping 실패: {embedder.base}")
+
+    if args.replica:
+        if len(collections) > 1:
+            print("[warn] --replica: 첫 번째 컬렉션 이름만 사용", file=sys.stderr)
+        collections = collections[:1]
+        client = build_replica(embedder, args.base, collections[0])
+    else:
+        client = get_qdrant(QDRANT_URL, QDRANT_API_KEY)
+
+    t0 = time.perf_counter()
+    all_vectors = embed_all(embedder, [q["query"] for q in queries])
+    print(f"[info] embedded queries in {time.perf_counter() - t0:.1f}s (측정 제외)", file=sys.stderr)
+
+    results = []
+    for coll in collections:
+        vectors, golds = all_vectors, [q["doc_id"] for q in queries]
+        if not args.keep_missing:
+            present = indexed_val_doc_ids(client, coll)
+            keep = [i for i, q in enumerate(queries) if q["doc_id"] in present]
+            vectors = [all_vectors[i] for i in keep]
+            golds = [golds[i] for i in keep]
+            print(f"[info] {coll}: {len(keep)}/{len(queries)} queries have their doc indexed", file=sys.stderr)
+        if not vectors:
+            print(f"[warn] {coll}: 평가할 질의 없음", file=sys.stderr)
+            continue
+        for ef in parse_ef_list(args.ef):
+            for quant in args.quant.split(","):
+                for bs in parse_int_list(args.batch_size):
+                    r = run_profile(client, coll, vectors, golds, ks, ef, quant, bs, oversample=args.oversample)
+                    results.append(r)
+                    print(f"[ok] {coll} ef={ef} quant={quant} bs={bs} "
+                          f"R@{ks[-1]}={r[f'recall@{ks[-1]}']} p95={r['latency_ms']['p95']}ms qps={r['qps']}",
+                          file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "target": "replica" if args.replica else QDRANT_URL,
+            "embed_url": embedder.base,
+            "n_queries_total": len(queries),
+            "k": ks,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[done] wrote {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.baseline:
+        problems = compare_baseline(results, args.baseline, args.max_recall_drop, args.max_latency_increase)
+        for p in problems:
+            print(f"[regression] {p}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# chunker.py
+# 목적: 긴 특허 청구항 / 법률 문장을 토큰 예산 기반의 겹치는 passage 로 쪼개 별도 포인트로 색인
+# - 스트리밍: 문장 단위 입력을 받아 passage 를 바로 yield (문서 전체를 한 번에 임베딩하지 않음)
+# - 결정적 ID: parent_id = uuid5(문서 키), iter_passages 의 기본 passage id = uuid5(parent_id, "p{idx}") (patent_db)
+#   → 재실행/다른 프로세스에서도 같은 포인트로 덮어씀
+#   (ipraw_db 는 한 doc_id 에 원문이 여러 벌일 수 있어 uuid5(parent_id, "{원문 해시}:p{idx}") 를 씀 — upsert_ipraw.py)
+# - 검색 시 parent_id 로 묶어 부모 문서당 1건만 반환 (collapse_by_parent / search_collapsed)
+
+import re, math, uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+# 프로젝트 고정 네임스페이스 (바꾸면 모든 포인트 ID 가 바뀜)
+ID_NAMESPACE = uuid.UUID("6f1c7a52-3b0e-5d47-9a51-2f3e8c4d9b10")
+
+MAX_TOKENS = 256      # passage 당 토큰 예산
+OVERLAP_TOKENS = 48   # 앞 passage 와 겹치는 꼬리 토큰 수
+
+_HANGUL = re.compile(r"[가-힣]")
+_SENT_SPLIT = re.compile(r"(?<=[.?!。])\s+|(?<=다\.)|\n+")
+_CLAIM_SPLIT = re.compile(r"(?=\[?청구항\s*\d+\]?)")
+
+# ── 토큰 수 추정
+
+def approx_tokens(text: str) -> int:
+    """토크나이저 없이 쓰는 보수적 추정치: 한글 ~0.7토큰/자, 그 외 ~0.25토큰/자."""
+    if not text:
+        return 0
+    hangul = len(_HANGUL.findall(text))
+    other = len(text) - hangul - text.count(" ")
+    return max(1, math.ceil(hangul * 0.7 + other * 0.25))
+
+# ── 문장 단위 분리
+
+def split_units(text: Any) -> List[str]:
+    """문자열/리스트 → 문장(청구항) 단위 리스트. 청구항 번호 경계를 우선 사용."""
+    if text is None:
+        return []
+    if isinstance(text, (list, tuple)):
+        out: List[str] = []
+        for t in text:
+            out.extend(split_units(t))
+        return out
+    units = []
+    for block in _CLAIM_SPLIT.split(str(text)):
+        for s in _SENT_SPLIT.split(block):
+            s = s.strip()
+            if s:
+                units.append(s)
+    return units
+
+
+def _hard_split(unit: str, max_tokens: int, count: Callable[[str], int]) -> Iterator[str]:
+    """단일 문장이 예산을 넘으면 글자 수 기준으로 자름."""
+    n = count(unit)
+    if n <= max_tokens:
+        yield unit
+        return
+    step = max(1, int(len(unit) * max_tokens / n))
+    for i in range(0, len(unit), step):
+        yield unit[i:i + step]
+
+
+def _tail(unit: str, budget: int, count: Callable[[str], int]) -> str:
+    """unit 의 뒤쪽 글자를 토큰 예산 이하만큼 (_hard_split 과 같은 글자 비율 기준)."""
+    n = count(unit)
+    if budget <= 0 or n == 0:
+        return ""
+    size = min(len(unit), max(1, int(len(unit) * budget / n)))
+    while size > 0 and count(unit[-size:].lstrip()) > budget:
+        size -= 1
+    return unit[-size:].lstrip() if size else ""
+
+# ── passage 생성
+
+def chunk_units(units: Iterable[str], max_tokens: int = MAX_TOKENS, overlap_tokens: int = OVERLAP_TOKENS,
+                count: Callable[[str], int] = approx_tokens) -> Iterator[str]:
+    """문장 스트림 → 토큰 예산 이하의 passage 스트림 (꼬리 overlap_tokens 만큼 겹침)."""
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens 는 max_tokens 보다 작아야 합니다.")
+    window: List[str] = []
+    sizes: List[int] = []
+    total = 0
+    for unit in units:
+        for piece in _hard_split(unit, max_tokens, count):
+            n = count(piece)
+            if window and total + n > max_tokens:
+                yield " ".join(window)
+                # 꼬리 문장을 overlap 예산만큼 유지
+                keep, kept = 0, 0
+                for s in reversed(sizes):
+                    if kept + s > overlap_tokens or kept + s + n > max_tokens:
+                        break
+                    kept += s
+                    keep += 1
+                tail_window, tail_sizes = (window[-keep:], sizes[-keep:]) if keep else ([], [])
+                # 예산이 남았는데 바로 앞 문장이 통째로는 안 들어가면 (청구항 1개 = 1문장 등) 그 뒷부분을 글자 단위로
+                if keep < len(window):
+                    part = _tail(window[-keep - 1], min(overlap_tokens, max_tokens - n) - kept, count)
+                    if part:
+                        m = count(part)
+                        tail_window, tail_sizes = [part] + tail_window, [m] + tail_sizes
+                        kept += m
+                window, sizes = tail_window, tail_sizes
+                total = kept
+            window.append(piece)
+            sizes.append(n)
+            total += n
+    if window:
+        yield " ".join(window)
+
+
+def parent_uuid(key: str) -> str:
+    return str(uuid.uuid5(ID_NAMESPACE, key))
+
+
+def child_uuid(parent_id: str, name: str) -> str:
+    return str(uuid.uuid5(uuid.UUID(parent_id), name))
+
+
+def iter_passages(parent_key: str, text: Any, max_tokens: int = MAX_TOKENS,
+                  overlap_tokens: int = OVERLAP_TOKENS) -> Iterator[Dict[str, Any]]:
+    """문서 키 + 원문 → {"id", "parent_id", "chunk_index", "passage"} 스트림."""
+    pid = parent_uuid(parent_key)
+    for idx, passage in enumerate(chunk_units(split_units(text), max_tokens, overlap_tokens)):
+        yield {"id": child_uuid(pid, f"p{idx}"), "parent_id": pid, "chunk_index": idx, "passage": passage}
+
+# ── 검색 시 부모 단위 collapse
+
+def collapse_by_parent(points: Iterable[Any], k: int, key: str = "parent_id") -> List[Any]:
+    """점수순 결과에서 같은 부모(payload[key])는 첫(최고점) 히트만 남김. 키 없는 포인트는 자기 자신이 부모."""
+    seen = set()
+    out = []
+    for p in points:
+        payload = getattr(p, "payload", None) or {}
+        pk = payload.get(key) or getattr(p, "id", None)
+        if pk in seen:
+            continue
+        seen.add(pk)
+        out.append(p)
+        if len(out) >= k:
+            break
+    return out
+
+
+def search_collapsed(client, collection: str, vector, k: int = 10, query_filter=None,
+                     with_payload: Any = True, group_by: str = "parent_id") -> List[Any]:
+    """서버측 group-by 로 부모 문서당 1건(최고점) 반환. parent_id 인덱스가 있으면 빠름."""
+    res = client.query_points_groups(
+        collection_name=collection, query=vector, group_by=group_by,
+        limit=k, group_size=1, query_filter=query_filter, with_payload=with_payload,
+    )
+    return [g.hits[0] for g in res.groups if g.hits]
@@ -0,0 +1,110 @@
+# cli.py
+# 목적: qdrant/ 스크립트의 단일 진입점
+# - 서브커맨드만 먼저 파싱하고, 해당 모듈은 그 다음에 import (--help / 오타는 즉시 종료)
+# - 나머지 인자는 각 스크립트의 main(argv) 로 그대로 전달 → 기존 단독 실행과 옵션 동일
+# - 클라이언트는 clients.py 에서 첫 사용 시 생성 (모듈 import 만으로는 연결 없음)
+# - startup: 모듈별 import 시간 / cold start 측정 (새 인터프리터에서), --max-ms 초과 시 exit 1
+#
+# 예) python qdrant/cli.py init --all --dry-run
+#     python qdrant/cli.py ingest ipraw --shard 0/4
+#     python qdrant/cli.py ingest patent --reset-checkpoint
+#     python qdrant/cli.py bench --replica --max-queries 500
+#     python qdrant/cli.py startup --max-ms 300
+
+import os, sys, argparse, importlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 서브커맨드 → (모듈, 설명)
+COMMANDS = {
+    "init": ("init_db", "스키마(qdrant/schemas/*.json) 적용"),
+    "ingest": (None, "데이터 업서트: ingest {ipraw|patent} [옵션]"),
+    "bench": ("bench_ipraw", "ipraw_db 검색 품질/지연 벤치마크"),
+    "startup": (None, "import / cold start 시간 측정"),
+}
+INGEST = {
+    "ipraw": "upsert_ipraw",
+    "patent": "upsert_patent_db",
+}
+# startup 측정 대상: 헬퍼만 import 하는 경우 무거운 의존성이 로드되면 안 되는 모듈
+LIGHT_MODULES = ["upsert_ipraw", "upsert_patent_db", "init_db", "bench_ipraw", "chunker", "sharding", "patent_fields"]
+HEAVY = ["qdrant_client", "requests", "numpy"]
+
+
+def run_module(name, argv):
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    return importlib.import_module(name).main(argv)
+
+
+def measure_startup(max_ms=None, repeat=3):
+    """새 인터프리터에서 모듈 import 시간(최솟값)과 무거운 의존성 로드 여부, CLI --help cold start."""
+    import json, subprocess, time
+
+    probe = (
+        "import sys, time, json; sys.path.insert(0, {here!r}); t = time.perf_counter(); import {mod}; "
+        "print(json.dumps({{'ms': (time.perf_counter() - t) * 1000, "
+        "'heavy': [m for m in {heavy!r} if m in sys.modules]}}))"
+    )
+    rows, ok = [], True
+    for mod in LIGHT_MODULES:
+        best, heavy = None, []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c", probe.format(here=HERE, mod=mod, heavy=HEAVY)],
+                                 capture_output=True, text=True, cwd=HERE)
+            if out.returncode != 0:
+                print(f"[err] import {mod}: {out.stderr.strip().splitlines()[-1:]}")
+                ok = False
+                break
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            best = r["ms"] if best is None else min(best, r["ms"])
+            heavy = r["heavy"]
+        if best is None:
+            continue
+        rows.append((f"import {mod}", best, heavy))
+
+    for cmd in (["--help"], ["ingest", "ipraw", "--help"], ["ingest", "patent", "--help"]):
+        best = None
+        for _ in range(repeat):
+            t = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(HERE, "cli.py")] + cmd, capture_output=True)
+            ms = (time.perf_counter() - t) * 1000
+            best = ms if best is None else min(best, ms)
+        rows.append(("cli.py " + " ".join(cmd), best, []))
+
+    for label, ms, heavy in rows:
+        flag = ""
+        if max_ms is not None and ms > max_ms:
+            flag, ok = " [over budget]", False
+        if heavy and label.startswith("import"):
+            flag += " [loads " + ",".join(heavy) + "]"
+        print(f"{label:<36} {ms:8.1f} ms{flag}")
+    return ok
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    ap = argparse.ArgumentParser(prog="cli.py", description="qdrant 스크립트 진입점 (init / ingest / bench / startup)",
+                                 formatter_class=argparse.RawDescriptionHelpFormatter,
+                                 epilog="\n".join(f"  {k:<8} {v[1]}" for k, v in COMMANDS.items()))
+    ap.add_argument("command", choices=list(COMMANDS), metavar="command")
+    ap.add_argument("args", nargs=argparse.REMAINDER, help="각 서브커맨드 옵션 (<command> --help)")
+    args = ap.parse_args(argv)
+
+    if args.command == "ingest":
+        if not args.args or args.args[0] not in INGEST:
+            ap.error(f"ingest 대상: {{{'|'.join(INGEST)}}}")
+        return run_module(INGEST[args.args[0]], args.args[1:])
+    if args.command == "startup":
+        sp = argparse.ArgumentParser(prog="cli.py startup")
+        sp.add_argument("--max-ms", type=float, default=None, help="항목별 허용 시간(ms), 초과 시 exit 1")
+        sp.add_argument("--repeat", type=int, default=3)
+        sa = sp.parse_args(args.args)
+        if not measure_startup(sa.max_ms, sa.repeat):
+            sys.exit(1)
+        return None
+    return run_module(COMMANDS[args.command][0], args.args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# clients.py
+# 목적: Qdrant / 임베딩 클라이언트를 처음 필요할 때 한 번만 생성해 재사용
+# - import 시점에는 네트워크 연결도, 무거운 import(qdrant_client ~0.7s, requests/numpy)도 없음
+#   → 헬퍼 함수만 가져다 쓰는 도구나 --help 는 빠르게 끝남
+# - 같은 (url, key) 조합이면 같은 객체 (lru_cache)
+#
+# 예) from clients import get_qdrant, get_embedder
+#     get_qdrant(QDRANT_URL, QDRANT_API_KEY).get_collections()
+#     get_embedder(EMBED_URL).embed(["질의"])
+
+from functools import lru_cache
+from typing import Optional
+
+
+@lru_cache(maxsize=None)
+def get_qdrant(url: Optional[str] = None, api_key: Optional[str] = None):
+    from qdrant_client import QdrantClient
+    return QdrantClient(url=url, api_key=api_key)
+
+
+@lru_cache(maxsize=None)
+def get_embedder(url: Optional[str] = None, timeout: int = 120):
+    from embed_client import EmbedClient
+    return EmbedClient(url, timeout=timeout)  # 바이너리 응답 협상, EMBED_DTYPE=float16 지원
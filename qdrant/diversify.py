@@ -0,0 +1,148 @@
+# diversify.py
+# 목적: 검색 후처리 — 같은 원문 중복 제거 + MMR(Maximal Marginal Relevance) 다양화
+# - ipraw_db 에는 같은 doc_id 의 qa/summary/passage 포인트, 내용이 겹치는 판결문/심결문이 함께 있어
+#   top-k 가 거의 같은 텍스트로 채워지기 쉬움 → LLM 컨텍스트 낭비
+# - 1) k * oversample 개를 with_vectors=True 로 한 번에 가져옴 (추가 왕복 없음)
+#   2) parent_id/doc_id 가 같은 히트는 최고점 1건만 남김 (collapse_by_key)
+#   3) 남은 후보에 대해 NumPy 로 MMR: 선택할 때마다 후보 전체와의 유사도를 한 번의 행렬곱으로 갱신
+#      → 후보 수백 개 기준 1ms 안팎
+#
+# 예)
+#   hits = search_diverse(client, "ipraw_db", embedder.embed([q])[0], k=5)
+#   python qdrant/diversify.py "PCT 국내단계 진입 기한" --k 5 --oversample 4 --lambda 0.5
+
+import os, sys, time, argparse
+from typing import Any, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+OVERSAMPLE = 4                    # 후보 수 = k * OVERSAMPLE
+MMR_LAMBDA = 0.5                  # 1.0 = 관련도만, 0.0 = 다양성만
+DUP_THRESHOLD = 0.97              # 이미 고른 결과와 코사인 유사도가 이 이상이면 후보에서 제외 (None=끄기)
+COLLAPSE_KEYS = ("parent_id", "doc_id")  # 앞에서부터 payload 에 있는 키로 묶음
+
+
+def group_key(point: Any, keys: Sequence[str] = COLLAPSE_KEYS) -> Any:
+    payload = getattr(point, "payload", None) or {}
+    for k in keys:
+        v = payload.get(k)
+        if v:
+            return v
+    return getattr(point, "id", None)
+
+
+def collapse_by_key(points: Iterable[Any], keys: Sequence[str] = COLLAPSE_KEYS) -> List[Any]:
+    """점수순 결과에서 같은 원문은 첫(최고점) 히트만 남김."""
+    seen = set()
+    out = []
+    for p in points:
+        g = group_key(p, keys)
+        if g in seen:
+            continue
+        seen.add(g)
+        out.append(p)
+    return out
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    n = np.linalg.norm(m, axis=-1, keepdims=True)
+    n[n == 0] = 1.0
+    return m / n
+
+
+def mmr(query: Any, candidates: Any, k: int, lambda_: float = MMR_LAMBDA,
+        dup_threshold: Optional[float] = DUP_THRESHOLD) -> List[int]:
+    """query (d,), candidates (n, d) → 선택된 후보 인덱스 (선택 순서).
+    score_i = λ·sim(q, c_i) − (1−λ)·max_{j∈S} sim(c_i, c_j)"""
+    C = _normalize(np.asarray(candidates, dtype=np.float32))
+    n = C.shape[0] if C.ndim == 2 else 0
+    if n == 0 or k <= 0:
+        return []
+    q = _normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+    rel = C @ q
+    max_sim = np.full(n, -np.inf, dtype=np.float32)   # 선택 집합과의 최대 유사도
+    alive = np.ones(n, dtype=bool)
+    picked: List[int] = []
+    for _ in range(min(k, n)):
+        red = np.where(np.isfinite(max_sim), max_sim, 0.0)
+        score = np.where(alive, lambda_ * rel - (1.0 - lambda_) * red, -np.inf)
+        j = int(np.argmax(score))
+        if not np.isfinite(score[j]):
+            break
+        picked.append(j)
+        alive[j] = False
+        np.maximum(max_sim, C @ C[j], out=max_sim)
+        if dup_threshold is not None:
+            alive &= max_sim < dup_threshold
+    return picked
+
+
+def _point_vector(p: Any, using: Optional[str]) -> Any:
+    v = getattr(p, "vector", None)
+    if isinstance(v, dict):
+        v = v.get(using) if using else next(iter(v.values()), None)
+    return v
+
+
+def search_diverse(client, collection: str, vector: Any, k: int = 5, oversample: int = OVERSAMPLE,
+                   lambda_: float = MMR_LAMBDA, dup_threshold: Optional[float] = DUP_THRESHOLD,
+                   query_filter=None, collapse_keys: Optional[Sequence[str]] = COLLAPSE_KEYS,
+                   using: Optional[str] = None, with_payload: Any = True, search_params=None) -> List[Any]:
+    """과샘플 검색 → 원문 단위 collapse → MMR. 반환 포인트의 vector 는 비움(응답 크기)."""
+    res = client.query_points(
+        collection_name=collection, query=np.asarray(vector, dtype=np.float32).tolist(),
+        limit=max(k, k * oversample), query_filter=query_filter, using=using,
+        with_payload=with_payload, with_vectors=[using] if using else True, search_params=search_params,
+    )
+    points = res.points
+    if collapse_keys:
+        points = collapse_by_key(points, collapse_keys)
+    points = [p for p in points if _point_vector(p, using) is not None]
+    if not points:
+        return []
+    order = mmr(vector, np.asarray([_point_vector(p, using) for p in points], dtype=np.float32),
+                k, lambda_=lambda_, dup_threshold=dup_threshold)
+    out = [points[i] for i in order]
+    for p in out:
+        p.vector = None
+    return out
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from qdrant_client import QdrantClient
+    from embed_client import EmbedClient
+
+    load_dotenv()
+    ap = argparse.ArgumentParser(description="중복 제거 + MMR 검색 결과 확인")
+    ap.add_argument("query")
+    ap.add_argument("--collection", default=os.getenv("COLLECTION", "ipraw_db"))
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--oversample", type=int, default=OVERSAMPLE)
+    ap.add_argument("--lambda", dest="lambda_", type=float, default=MMR_LAMBDA)
+    ap.add_argument("--dup-threshold", type=float, default=DUP_THRESHOLD, help="음수면 끄기")
+    ap.add_argument("--plain", action="store_true", help="비교용: 후처리 없는 top-k 도 출력")
+    args = ap.parse_args()
+
+    client = QdrantClient(url=os.getenv("QDRANT_URL", "http://localhost:6333"),
+                          api_key=os.getenv("QDRANT_API_KEY") or None)
+    qv = EmbedClient(os.getenv("EMBED_URL", "http://localhost:8000")).embed([args.query])[0]
+
+    def show(title, pts):
+        print(f"── {title}")
+        for r, p in enumerate(pts, 1):
+            pl = p.payload or {}
+            # ipraw_db: doc_id / title / passage, patent_db: documentId / title / passage
+            doc = pl.get("doc_id") or pl.get("documentId") or p.id
+            text = pl.get("passage") or pl.get("title") or ""
+            print(f"{r:2d}. {p.score:.4f} {pl.get('point_type', '-'):<7} {doc} {str(text)[:60]!r}")
+
+    if args.plain:
+        show("plain", client.query_points(collection_name=args.collection, query=qv.tolist(),
+                                          limit=args.k, with_payload=True).points)
+    t0 = time.perf_counter()
+    hits = search_diverse(client, args.collection, qv, k=args.k, oversample=args.oversample,
+                          lambda_=args.lambda_, dup_threshold=None if args.dup_threshold < 0 else args.dup_threshold)
+    ms = (time.perf_counter() - t0) * 1000
+    show(f"diverse (k={args.k}, candidates={args.k * args.oversample}, {ms:.1f} ms)", hits)
+    sys.exit(0 if hits else 1)
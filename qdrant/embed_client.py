@@ -1,27 +1,62 @@
-import requests, time, os
+import requests, time, os, io
 from typing import List
 
+import numpy as np
+
 EMBED_URL = os.getenv("EMBED_URL", "http://localhost:8000")
+EMBED_DTYPE = os.getenv("EMBED_DTYPE", "float32")  # float16 이면 수신 직후 다운캐스트
+
+# 바이너리 응답 우선 협상: .npy > raw little-endian float32 > JSON(fallback)
+ACCEPT_BINARY = "application/x-npy, application/octet-stream;q=0.9, application/json;q=0.5"
 
 class EmbedClient:
-    def __init__(self, base: str | None = None, timeout: int = 30):
+    def __init__(self, base: str | None = None, timeout: int = 30, dtype: str | None = None, binary: bool = True):
         self.base = base or EMBED_URL
         self.timeout = timeout
+        self.dtype = np.dtype(dtype or EMBED_DTYPE)
+        self.binary = binary
+        self.session = requests.Session()  # keep-alive 재사용
 
-    def ping(self) -> bool:
+    def info(self) -> dict:
+        """/ping 응답 (status, 서버가 알려주면 model 등). 실패 시 {}."""
         try:
-            r = requests.get(f"{self.base}/ping", timeout=5)
-            return r.ok and r.json().get("status") == "ok"
+            r = self.session.get(f"{self.base}/ping", timeout=5)
+            return r.json() if r.ok else {}
         except Exception:
-            return False
+            return {}
 
-    def embed(self, texts: List[str]) -> List[List[float]]:
+    def ping(self) -> bool:
+        return self.info().get("status") == "ok"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """texts → (len(texts), dim) C-contiguous 배열 (dtype=self.dtype)."""
+        headers = {"Accept": ACCEPT_BINARY if self.binary else "application/json"}
         for attempt in range(3):
             try:
-                r = requests.post(f"{self.base}/embed", json={"texts": texts}, timeout=self.timeout)
+                r = self.session.post(f"{self.base}/embed", json={"texts": texts}, headers=headers, timeout=self.timeout)
                 r.raise_for_status()
-                return r.json()["embeddings"]
+                return self._decode(r, len(texts))
             except Exception:
                 if attempt == 2:
                     raise
                 time.sleep(0.5 * (attempt + 1))
+
+    def _decode(self, r: requests.Response, n: int) -> np.ndarray:
+        ctype = r.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if ctype == "application/x-npy":
+            arr = np.load(io.BytesIO(r.content), allow_pickle=False)
+        elif ctype == "application/octet-stream":
+            # raw float32 LE, 행 수 = 입력 수 (X-Embedding-Dim 헤더가 있으면 검증)
+            arr = np.frombuffer(r.content, dtype="<f4")
+            dim = int(r.headers.get("X-Embedding-Dim") or (arr.size // n if n else 0))
+            if n == 0 or dim * n != arr.size:
+                raise RuntimeError(f"/embed 바이너리 응답 크기 불일치: {arr.size} floats for {n} texts")
+            arr = arr.reshape(n, dim)
+        else:
+            data = r.json()
+            if "embeddings" not in data:
+                raise RuntimeError("/embed 응답에 'embeddings' 없음")
+            arr = np.asarray(data["embeddings"], dtype=np.float32)
+        if arr.ndim != 2 or arr.shape[0] != n:
+            raise RuntimeError(f"/embed 응답 shape 오류: {arr.shape} (expected {n} rows)")
+        return np.ascontiguousarray(arr, dtype=self.dtype)
@@ -0,0 +1,357 @@
+# init_db.py
+# 목적: 선언형 스키마(qdrant/schemas/<collection>.json)를 Qdrant 컬렉션에 적용
+# - 컬렉션이 없으면 생성, 있으면 라이브 설정과 diff
+#   · 벡터 dim/metric, sparse 벡터 불일치 → 에러 (--recreate 시 삭제 후 재생성)
+#   · hnsw/quantization 차이 → update_collection 으로 반영
+#   · payload 인덱스: 없는 것만 생성, 타입이 다르면 경고 (--fix-indexes 시 삭제 후 재생성)
+# - vectors.size 가 "auto" 면 임베딩 서버로 한 번만 probe 하고 모델별로 캐시(EMBED_DIM_CACHE)
+#   · 캐시 키: 스키마 model > EMBED_MODEL > 서버 /ping 이 알려준 model (URL 은 키로 쓰지 않음)
+#   · dim 불일치가 나오면 캐시를 믿지 않고 다시 probe 한 뒤에만 --recreate 를 권함
+#
+# 스키마 예:
+# {
+#   "collection": "ipraw_db",
+#   "vectors": {"size": "auto", "distance": "Cosine"},          # 또는 {"dense": {...}, ...} 이름 있는 벡터
+#   "sparse_vectors": {"bm25": {"modifier": "idf"}},
+#   "hnsw": {"m": 16, "ef_construct": 100},
+#   "quantization": {"scalar": {"type": "int8", "quantile": 0.99, "always_ram": true}},
+#   "payload_indexes": {"kind": "keyword", "year": {"type": "integer", "range": true}}
+# }
+#
+# 예) python qdrant/init_db.py qdrant/schemas/ipraw_db.json qdrant/schemas/patent_db.json
+#     python qdrant/init_db.py --all --dry-run
+
+from __future__ import annotations
+
+import os, sys, json, glob, argparse
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+from clients import get_qdrant, get_embedder
+
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models
+
+# ── env 로드
+load_dotenv()
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")  # Cloud면 필수
+EMBED_URL = os.getenv("EMBED_URL", "http://localhost:8000")
+EMBED_MODEL = os.getenv("EMBED_MODEL")  # dim 캐시 키 (없으면 서버가 보고한 model, 그것도 없으면 캐시 안 함)
+EMBED_DIM_CACHE = os.getenv("EMBED_DIM_CACHE", ".cache/embed_dim.json")
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schemas")
+
+# payload 인덱스 타입 → qdrant models 클래스 이름
+INDEX_PARAMS = {
+    "keyword": "KeywordIndexParams",
+    "integer": "IntegerIndexParams",
+    "float": "FloatIndexParams",
+    "bool": "BoolIndexParams",
+    "geo": "GeoIndexParams",
+    "datetime": "DatetimeIndexParams",
+    "text": "TextIndexParams",
+    "uuid": "UuidIndexParams",
+}
+
+
+@lru_cache(maxsize=None)
+def _models():
+    """qdrant_client.http.models — import 가 무거워서 스키마를 실제로 적용할 때만 로드."""
+    from qdrant_client.http import models
+    return models
+
+# ── 스키마 로드
+
+def load_schema(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        schema = json.load(f)
+    if "collection" not in schema or "vectors" not in schema:
+        raise ValueError(f"{path}: 'collection', 'vectors' 는 필수입니다.")
+    return schema
+
+
+def schema_path(name: str) -> str:
+    return os.path.join(SCHEMA_DIR, f"{name}.json")
+
+
+def is_named(vectors: Dict[str, Any]) -> bool:
+    """{"size":..,"distance":..} 이면 단일(무명) 벡터, 아니면 이름 → 설정 dict."""
+    return "size" not in vectors and "distance" not in vectors
+
+# ── 임베딩 차원 (모델별 캐시)
+
+def _read_dim_cache() -> Dict[str, int]:
+    try:
+        with open(EMBED_DIM_CACHE, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_dim_cache(cache: Dict[str, int]) -> None:
+    os.makedirs(os.path.dirname(EMBED_DIM_CACHE) or ".", exist_ok=True)
+    with open(EMBED_DIM_CACHE, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+
+
+def resolve_dim(model: Optional[str] = None, refresh: bool = False) -> int:
+    """모델 이름 키로 캐시된 차원을 반환, 없거나 refresh 면 /embed probe.
+    같은 URL 뒤의 모델이 바뀌어도 틀린 dim 을 쓰지 않도록 URL 은 캐시 키로 쓰지 않는다."""
+    key = model or EMBED_MODEL
+    cache = _read_dim_cache()
+    if key and not refresh and key in cache:
+        return int(cache[key])
+
+    embedder = get_embedder(EMBED_URL, timeout=15)
+    info = embedder.info()
+    if info.get("status") != "ok":
+        raise RuntimeError(f"임베딩 서버 ping 실패: {EMBED_URL}")
+    served = info.get("model")
+    if model and served and model != served:
+        print(f"[warn] 스키마 model='{model}' 이지만 서버는 '{served}' 를 서빙 중")
+    key = key or served
+    if key and not refresh and key in cache:
+        return int(cache[key])
+    emb = embedder.embed(["dim probe"])[0]
+    if len(emb) == 0:
+        raise RuntimeError("임베딩 응답 형식이 올바르지 않습니다.")
+    dim = len(emb)
+
+    if not key:
+        print(f"[warn] 모델 이름을 알 수 없어 dim={dim} 을 캐시하지 않습니다 (.env 에 EMBED_MODEL 지정 권장)")
+        return dim
+    cache[key] = dim
+    _write_dim_cache(cache)
+    print(f"[info] probed embedding dim = {dim} (cached as '{key}')")
+    return dim
+
+# ── 스키마 → qdrant models
+
+def _vector_params(spec: Dict[str, Any], dim_fn) -> models.VectorParams:
+    spec = dict(spec)
+    model = spec.pop("model", None)
+    if spec.get("size", "auto") == "auto":
+        spec["size"] = dim_fn(model)
+    return _models().VectorParams(**spec)
+
+
+def build_vectors_config(schema: Dict[str, Any], dim_fn):
+    vectors = schema["vectors"]
+    if is_named(vectors):
+        return {name: _vector_params(spec, dim_fn) for name, spec in vectors.items()}
+    return _vector_params(vectors, dim_fn)
+
+
+def build_sparse_config(schema: Dict[str, Any]) -> Optional[Dict[str, models.SparseVectorParams]]:
+    sparse = schema.get("sparse_vectors") or {}
+    return {name: _models().SparseVectorParams(**spec) for name, spec in sparse.items()} or None
+
+
+def build_quantization(schema: Dict[str, Any]):
+    q = schema.get("quantization")
+    if not q:
+        return None
+    if "scalar" in q:
+        return _models().ScalarQuantization(**q)
+    if "product" in q:
+        return _models().ProductQuantization(**q)
+    if "binary" in q:
+        return _models().BinaryQuantization(**q)
+    raise ValueError(f"unknown quantization spec: {q}")
+
+
+def build_index_params(spec):
+    """"keyword" 같은 문자열 또는 {"type": "integer", "range": true, ...}."""
+    if isinstance(spec, str):
+        return spec, _models().PayloadSchemaType(spec)
+    spec = dict(spec)
+    type_name = spec["type"]
+    if len(spec) == 1:
+        return type_name, _models().PayloadSchemaType(type_name)
+    return type_name, getattr(_models(), INDEX_PARAMS[type_name])(**spec)
+
+# ── diff 유틸
+
+def _subset_diff(live: Any, desired: Any, prefix: str = "") -> List[str]:
+    """desired 에 명시된 키만 live 와 비교 → 다른 경로 목록."""
+    if hasattr(live, "model_dump"):
+        live = live.model_dump(mode="json")
+    if hasattr(desired, "model_dump"):
+        desired = desired.model_dump(mode="json", exclude_none=True)
+    if isinstance(desired, dict):
+        if not isinstance(live, dict):
+            return [f"{prefix or '.'}: {live!r} → {desired!r}"]
+        diffs = []
+        for k, v in desired.items():
+            diffs += _subset_diff(live.get(k), v, f"{prefix}.{k}" if prefix else k)
+        return diffs
+    return [] if live == desired else [f"{prefix}: {live!r} → {desired!r}"]
+
+
+def diff_vectors(live_params, schema: Dict[str, Any], dim_fn) -> List[str]:
+    desired = build_vectors_config(schema, dim_fn)
+    live = live_params.vectors
+    if isinstance(desired, dict) != isinstance(live, dict):
+        return ["vectors: named/unnamed 구성이 다릅니다"]
+    if not isinstance(desired, dict):
+        return _subset_diff(live, desired, "vectors")
+    diffs = []
+    for name, params in desired.items():
+        if name not in live:
+            diffs.append(f"vectors.{name}: missing")
+        else:
+            diffs += _subset_diff(live[name], params, f"vectors.{name}")
+    return diffs
+
+
+def diff_sparse(live_params, schema: Dict[str, Any]) -> List[str]:
+    desired = build_sparse_config(schema) or {}
+    live = live_params.sparse_vectors or {}
+    diffs = [f"sparse_vectors.{n}: missing" for n in desired if n not in live]
+    diffs += [f"sparse_vectors.{n}: not in schema" for n in live if n not in desired]
+    return diffs
+
+# ── 적용
+
+def ensure_collection(client: QdrantClient, name: str, schema: Dict[str, Any], *,
+                      dim_fn, recreate: bool = False, dry_run: bool = False) -> bool:
+    existing = {c.name for c in client.get_collections().collections}
+    if name in existing:
+        params = client.get_collection(name).config.params
+        problems = diff_vectors(params, schema, dim_fn) + diff_sparse(params, schema)
+        if any(p.split(":")[0].endswith(".size") for p in problems):
+            # 캐시된 dim 이 낡았을 수 있음 → 다시 probe 해서 확인한 뒤에만 불일치로 판단
+            print(f"[info] '{name}' 벡터 불일치 → 임베딩 dim 재확인")
+            problems = diff_vectors(params, schema, lambda m: dim_fn(m, refresh=True)) + diff_sparse(params, schema)
+        if not problems:
+            print(f"[ok] collection '{name}' matches schema")
+            return True
+        for p in problems:
+            print(f"[err] {name} {p}")
+        if not recreate:
+            print(f"[err] '{name}' 벡터 구성이 스키마와 다릅니다. --recreate 로 재생성하세요(데이터 삭제).")
+            return False
+        if dry_run:
+            print(f"[dry-run] would recreate '{name}'")
+            return True
+        client.delete_collection(name)
+        print(f"[warn] deleted collection '{name}' for recreate")
+
+    if dry_run:
+        print(f"[dry-run] would create collection '{name}'")
+        return True
+    client.create_collection(
+        collection_name=name,
+        vectors_config=build_vectors_config(schema, dim_fn),
+        sparse_vectors_config=build_sparse_config(schema),
+        hnsw_config=_models().HnswConfigDiff(**schema["hnsw"]) if schema.get("hnsw") else None,
+        quantization_config=build_quantization(schema),
+    )
+    print(f"[ok] created collection '{name}'")
+    return True
+
+
+def ensure_collection_params(client: QdrantClient, name: str, schema: Dict[str, Any], *, dry_run: bool = False):
+    """hnsw / quantization 은 데이터 유지한 채 update 가능 → 차이만 반영."""
+    config = client.get_collection(name).config
+    hnsw = schema.get("hnsw")
+    hnsw_diff = _subset_diff(config.hnsw_config, hnsw, "hnsw") if hnsw else []
+    quant = build_quantization(schema)
+    if quant is not None:
+        quant_diff = _subset_diff(config.quantization_config, quant, "quantization")
+    else:
+        quant_diff = [] if config.quantization_config is None else ["quantization: → disabled"]
+    if not hnsw_diff and not quant_diff:
+        return
+    for d in hnsw_diff + quant_diff:
+        print(f"[info] {name} {d}")
+    if dry_run:
+        return
+    client.update_collection(
+        collection_name=name,
+        hnsw_config=_models().HnswConfigDiff(**hnsw) if hnsw_diff else None,
+        quantization_config=(quant or _models().Disabled.DISABLED) if quant_diff else None,
+    )
+    print(f"[ok] updated collection params: {name}")
+
+
+def ensure_payload_indexes(client: QdrantClient, name: str, schema: Dict[str, Any], *,
+                           fix: bool = False, dry_run: bool = False) -> bool:
+    live = client.get_collection(name).payload_schema or {}
+    ok = True
+    for field, spec in (schema.get("payload_indexes") or {}).items():
+        type_name, field_schema = build_index_params(spec)
+        cur = live.get(field)
+        if cur is not None:
+            if cur.data_type.value == type_name:
+                continue
+            if not fix:
+                print(f"[warn] index {field}: live={cur.data_type.value}, schema={type_name} (--fix-indexes 로 재생성)")
+                ok = False
+                continue
+            if dry_run:
+                print(f"[dry-run] would recreate index {field} ({cur.data_type.value} → {type_name})")
+                continue
+            client.delete_payload_index(collection_name=name, field_name=field)
+        if dry_run:
+            print(f"[dry-run] would create index {field} ({type_name})")
+            continue
+        client.create_payload_index(collection_name=name, field_name=field, field_schema=field_schema)
+        print(f"[ok] payload index created: {field} ({type_name})")
+    return ok
+
+
+def apply_schema(client: QdrantClient, schema: Dict[str, Any], *, collection: Optional[str] = None,
+                 recreate: bool = False, fix_indexes: bool = False, dry_run: bool = False,
+                 refresh_dim: bool = False) -> bool:
+    name = collection or schema["collection"]
+    print(f"[info] COLLECTION={name}")
+    dim_fn = lambda model, refresh=refresh_dim: resolve_dim(model, refresh=refresh)
+    if not ensure_collection(client, name, schema, dim_fn=dim_fn, recreate=recreate, dry_run=dry_run):
+        return False
+    if name not in {c.name for c in client.get_collections().collections}:
+        return True  # dry-run 에서 아직 생성 전
+    ensure_collection_params(client, name, schema, dry_run=dry_run)
+    return ensure_payload_indexes(client, name, schema, fix=fix_indexes, dry_run=dry_run)
+
+# ── 엔트리포인트
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Apply declarative collection schemas to Qdrant")
+    ap.add_argument("schemas", nargs="*", help="스키마 JSON 경로 또는 컬렉션 이름 (qdrant/schemas/<name>.json)")
+    ap.add_argument("--all", action="store_true", help="qdrant/schemas/*.json 전부 적용")
+    ap.add_argument("--collection", default=None, help="컬렉션 이름 덮어쓰기 (스키마 1개일 때)")
+    ap.add_argument("--recreate", action="store_true", help="벡터 구성이 다르면 삭제 후 재생성 (데이터 손실)")
+    ap.add_argument("--fix-indexes", action="store_true", help="타입이 다른 payload 인덱스를 삭제 후 재생성")
+    ap.add_argument("--refresh-dim", action="store_true", help="캐시 무시하고 임베딩 차원 다시 probe")
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args(argv)
+
+    paths = sorted(glob.glob(os.path.join(SCHEMA_DIR, "*.json"))) if args.all else []
+    paths += [s if s.endswith(".json") else schema_path(s) for s in args.schemas]
+    if not paths:
+        ap.error("스키마를 지정하거나 --all 을 사용하세요.")
+    if args.collection and len(paths) > 1:
+        ap.error("--collection 은 스키마 1개일 때만 사용할 수 있습니다.")
+
+    print(f"[info] QDRANT_URL={QDRANT_URL}")
+    client = get_qdrant(QDRANT_URL, QDRANT_API_KEY)
+    ok = True
+    for path in paths:
+        try:
+            schema = load_schema(path)
+            ok = apply_schema(client, schema, collection=args.collection, recreate=args.recreate,
+                              fix_indexes=args.fix_indexes, dry_run=args.dry_run,
+                              refresh_dim=args.refresh_dim) and ok
+        except Exception as e:
+            print(f"[err] {path}: {e}")
+            ok = False
+    if not ok:
+        sys.exit(1)
+    print("[done] 스키마 적용 완료")
+
+
+if __name__ == "__main__":
+    main()
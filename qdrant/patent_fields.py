@@ -0,0 +1,176 @@
+# patent_fields.py
+# 목적: 특허 원본 JSON → 인덱싱용 파생 payload 필드 (IPC 계층, 출원인, 연도/날짜) + 검색 필터 빌더
+# - IPC: "G06F 17/30" → section "G", class "G06", subclass "G06F", 정규화 코드 "G06F 17/30"
+# - 날짜: 'YYYYMMDD' 등 → *_year(INTEGER) + *_at(DATETIME, RFC3339) 로 범위 필터 가능
+#   (기존 *_date KEYWORD 문자열은 호환을 위해 그대로 둠)
+# - build_patent_filter(ipc="G06F", year_from=2019, year_to=2022) → payload 인덱스를 타는 Filter
+
+from __future__ import annotations
+
+import re
+from datetime import date
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from qdrant_client.http.models import Filter
+
+# 원본 데이터셋마다 키 이름이 조금씩 달라 후보를 순서대로 확인
+IPC_KEYS = ("ipc_all", "ipcNumber", "ipc_number", "ipc", "ipc_code", "ipcCode", "ipc_list")
+IPC_MAIN_KEYS = ("ipc_main", "mainIpc", "main_ipc", "ipcMain")
+APPLICANT_KEYS = ("applicant_name", "applicantName", "applicant", "applicants")
+DATE_FIELDS = ("application", "open", "register")  # → {f}_date / {f}_year / {f}_at
+
+_IPC_RE = re.compile(r"^\s*([A-H])\s*(\d{2})\s*([A-Z])\s*(?:[-\s]*0*(\d{1,4})\s*/\s*(\d{1,6}))?")
+_IPC_SPLIT = re.compile(r"[|,;\n]+")
+_NAME_SPLIT = re.compile(r"[|;\n]+")  # 'Co., Ltd.' 때문에 쉼표로는 나누지 않음
+_DATE_DIGITS = re.compile(r"\D")
+
+# ── IPC
+
+def parse_ipc(code: Any) -> Optional[Dict[str, str]]:
+    """IPC 코드 1개 → {"code", "section", "class", "subclass"}; 형식이 아니면 None."""
+    if not code:
+        return None
+    m = _IPC_RE.match(str(code).upper())
+    if not m:
+        return None
+    sec, cls, sub, group, subgroup = m.groups()
+    subclass = f"{sec}{cls}{sub}"
+    full = f"{subclass} {int(group)}/{subgroup}" if group else subclass
+    return {"code": full, "section": sec, "class": f"{sec}{cls}", "subclass": subclass}
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def _first(pat: Dict[str, Any], keys: Iterable[str]) -> Any:
+    for k in keys:
+        v = pat.get(k)
+        if v not in (None, "", []):
+            return v
+    return None
+
+
+def ipc_fields(pat: Dict[str, Any]) -> Dict[str, Any]:
+    raw: List[str] = []
+    for v in _as_list(_first(pat, IPC_KEYS)):
+        if isinstance(v, dict):
+            v = v.get("code") or v.get("ipc") or v.get("ipcNumber")
+        raw.extend(_IPC_SPLIT.split(str(v)) if v else [])
+    parsed = [p for p in (parse_ipc(r) for r in raw) if p]
+
+    main = parse_ipc(_first(pat, IPC_MAIN_KEYS)) or (parsed[0] if parsed else None)
+    if main and all(p["code"] != main["code"] for p in parsed):
+        parsed.insert(0, main)
+    if not parsed:
+        return {}
+
+    def uniq(key):
+        return list(dict.fromkeys(p[key] for p in parsed))
+
+    return {
+        "ipc_main": main["code"],
+        "ipc_all": uniq("code"),
+        "ipc_section": uniq("section"),
+        "ipc_class": uniq("class"),
+        "ipc_subclass": uniq("subclass"),
+    }
+
+# ── 출원인
+
+def applicant_names(pat: Dict[str, Any]) -> List[str]:
+    names = []
+    for v in _as_list(_first(pat, APPLICANT_KEYS)):
+        if isinstance(v, dict):
+            v = v.get("name") or v.get("applicant_name") or v.get("applicantName")
+        for n in _NAME_SPLIT.split(str(v)) if v else []:
+            n = n.strip()
+            if n:
+                names.append(n)
+    return list(dict.fromkeys(names))
+
+# ── 날짜
+
+def parse_date(value: Any) -> Optional[date]:
+    """'YYYYMMDD', 'YYYY.MM.DD', 'YYYY-MM-DD', 20190301 → date; 실패 시 None."""
+    if value is None:
+        return None
+    digits = _DATE_DIGITS.sub("", str(value))
+    if len(digits) < 8:
+        return None
+    try:
+        return date(int(digits[:4]), int(digits[4:6]), int(digits[6:8]))
+    except ValueError:
+        return None
+
+
+def date_fields(pat: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for f in DATE_FIELDS:
+        d = parse_date(pat.get(f"{f}_date"))
+        if d:
+            out[f"{f}_year"] = d.year
+            out[f"{f}_at"] = f"{d.isoformat()}T00:00:00Z"
+    return out
+
+
+def derive_fields(pat: Dict[str, Any]) -> Dict[str, Any]:
+    """build_payload 에 합칠 인덱싱용 파생 필드 (값이 없으면 키 자체를 생략)."""
+    out = {}
+    out.update(ipc_fields(pat))
+    names = applicant_names(pat)
+    if names:
+        out["applicant_name"] = names
+    out.update(date_fields(pat))
+    return out
+
+# ── 검색 필터
+
+def build_patent_filter(*, ipc: Optional[Iterable[str]] = None, applicant: Optional[Iterable[str]] = None,
+                        year_from: Optional[int] = None, year_to: Optional[int] = None,
+                        date_from: Optional[str] = None, date_to: Optional[str] = None,
+                        date_field: str = "application", extra: Optional[List[Any]] = None) -> Optional[Filter]:
+    """ipc 는 길이로 수준 자동 판별 (1=section, 3=class, 4=subclass, 그 이상=full code).
+    예) build_patent_filter(ipc="G06F", year_from=2019, year_to=2022)"""
+    # ingest 경로(derive_fields)는 qdrant_client 없이 import 되도록 필터를 만들 때만 로드
+    from qdrant_client.http.models import Filter, FieldCondition, MatchAny, MatchValue, Range, DatetimeRange
+
+    must: List[Any] = list(extra or [])
+    if ipc:
+        codes = [ipc] if isinstance(ipc, str) else list(ipc)
+        by_field: Dict[str, List[str]] = {}
+        for c in codes:
+            c = c.strip().upper()
+            p = parse_ipc(c)
+            if len(c) == 1:
+                by_field.setdefault("ipc_section", []).append(c)
+            elif len(c) == 3:
+                by_field.setdefault("ipc_class", []).append(c)
+            elif p and p["code"] == p["subclass"]:
+                by_field.setdefault("ipc_subclass", []).append(p["subclass"])
+            elif p:
+                by_field.setdefault("ipc_all", []).append(p["code"])
+        if len(by_field) == 1:
+            (field, vals), = by_field.items()
+            must.append(FieldCondition(key=field, match=MatchAny(any=vals)))
+        elif by_field:
+            must.append(Filter(should=[FieldCondition(key=f, match=MatchAny(any=v)) for f, v in by_field.items()]))
+    if applicant:
+        names = [applicant] if isinstance(applicant, str) else list(applicant)
+        cond = MatchValue(value=names[0]) if len(names) == 1 else MatchAny(any=names)
+        must.append(FieldCondition(key="applicant_name", match=cond))
+    if year_from is not None or year_to is not None:
+        must.append(FieldCondition(key=f"{date_field}_year", range=Range(gte=year_from, lte=year_to)))
+    if date_from or date_to:
+        def iso(v):
+            d = parse_date(v)
+            return f"{d.isoformat()}T00:00:00Z" if d else v
+        must.append(FieldCondition(key=f"{date_field}_at",
+                                   range=DatetimeRange(gte=iso(date_from) if date_from else None,
+                                                       lte=iso(date_to) if date_to else None)))
+    return Filter(must=must) if must else None
@@ -0,0 +1,36 @@
+# point_buffer.py
+# 목적: 업서트 대기 포인트를 (ids, 연속 NumPy 벡터 블록, payloads) 로 모아두는 버퍼
+# - PointStruct 당 파이썬 float 리스트를 만들지 않고 임베딩 응답 배열을 그대로 보관
+# - take() 시 한 번만 concatenate → qdrant.upload_collection(vectors=ndarray) 로 전달
+# - tags: 포인트별 원본 파일 키 (체크포인트가 파일 단위 완료를 판단할 때 사용)
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class PointBuffer:
+    def __init__(self):
+        self.ids: List[Any] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.blocks: List[np.ndarray] = []
+        self.tags: List[Any] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, ids: List[Any], vectors: np.ndarray, payloads: List[Dict[str, Any]],
+            tags: Optional[List[Any]] = None):
+        if len(ids) != len(vectors) or len(ids) != len(payloads):
+            raise ValueError(f"length mismatch: ids={len(ids)}, vectors={len(vectors)}, payloads={len(payloads)}")
+        self.ids.extend(ids)
+        self.payloads.extend(payloads)
+        self.blocks.append(vectors)
+        self.tags.extend(tags if tags is not None else [None] * len(ids))
+
+    def take(self) -> Tuple[List[Any], np.ndarray, List[Dict[str, Any]], List[Any]]:
+        """→ (ids, vectors, payloads, tags) 후 버퍼 비움."""
+        ids, payloads, tags = self.ids, self.payloads, self.tags
+        vectors = self.blocks[0] if len(self.blocks) == 1 else np.concatenate(self.blocks)
+        self.ids, self.payloads, self.blocks, self.tags = [], [], [], []
+        return ids, vectors, payloads, tags
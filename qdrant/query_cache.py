@@ -0,0 +1,181 @@
+# query_cache.py
+# 목적: 반복되는 라우터 질의(수수료/기한/PCT 진입 등)를 임베딩·Qdrant 호출 없이 캐시에서 응답
+# - 1차: 정규화한 질의 문자열 exact 매치 → /embed, Qdrant 모두 생략
+# - 2차: 최근 질의 임베딩 행렬에 대한 코사인 유사도(in-memory, 최대 capacity 개) ≥ threshold → Qdrant 생략
+# - TTL + LRU 제거, 컬렉션 변경(version_fn 토큰 변화) 시 전체 무효화
+# - 이 저장소 안에는 아직 호출하는 코드가 없음 (질의 서빙 쪽에서 붙여 쓰는 라이브러리), 동작은 tests/test_query_cache.py
+#
+# 예)
+#   cache = SemanticQueryCache.for_collection(QdrantClient(...), "ipraw_db", EmbedClient())
+#   hits = cache.search("PCT 국내단계 진입 기한이 언제야?", k=5)
+#   print(cache.stats())
+
+import re, time, json, threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+_WS = re.compile(r"\s+")
+_TRAIL_PUNCT = re.compile(r"[\s?？!.。]+$")
+
+
+def normalize_query(q: str) -> str:
+    """공백/대소문자/끝 문장부호 차이는 같은 질의로 취급."""
+    return _TRAIL_PUNCT.sub("", _WS.sub(" ", (q or "").strip().lower()))
+
+
+def filter_key(query_filter: Any) -> Optional[str]:
+    if query_filter is None:
+        return None
+    if hasattr(query_filter, "model_dump"):
+        query_filter = query_filter.model_dump(mode="json", exclude_none=True)
+    return json.dumps(query_filter, sort_keys=True, ensure_ascii=False)
+
+
+def collection_version(client, collection: str) -> Tuple:
+    """컬렉션 변경 감지용 토큰. points_count / 상태 / payload 스키마가 바뀌면 달라짐.
+    같은 id 덮어쓰기(개수 불변)는 감지하지 못하므로 ingest 후에는 invalidate() 호출 권장."""
+    info = client.get_collection(collection)
+    return (info.points_count, str(info.status), tuple(sorted((info.payload_schema or {}).keys())))
+
+
+@dataclass
+class _Entry:
+    slot: int
+    scope: Tuple[int, Optional[str]]  # (k, filter_key) — 같은 scope 끼리만 재사용
+    results: Any
+    expires_at: float
+
+
+class SemanticQueryCache:
+    def __init__(self, embed_fn: Callable[[List[str]], Any], search_fn: Callable[..., Any], *,
+                 version_fn: Optional[Callable[[], Hashable]] = None, threshold: float = 0.95,
+                 ttl: float = 600.0, capacity: int = 1024, version_check_interval: float = 5.0):
+        """embed_fn(texts) → 벡터들, search_fn(vector, k, query_filter) → 결과(top-k)."""
+        self.embed_fn = embed_fn
+        self.search_fn = search_fn
+        self.version_fn = version_fn
+        self.threshold = threshold
+        self.ttl = ttl
+        self.capacity = capacity
+        self.version_check_interval = version_check_interval
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()  # (norm, k, filter) → entry, LRU 순
+        self._vecs: Optional[np.ndarray] = None      # (capacity, dim) 정규화된 질의 벡터
+        self._slot_key: List[Optional[Tuple]] = [None] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+        self._version: Hashable = None
+        self._version_checked = 0.0
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @classmethod
+    def for_collection(cls, client, collection: str, embedder, **kw) -> "SemanticQueryCache":
+        """QdrantClient + EmbedClient 로 구성하는 기본 캐시."""
+        def search_fn(vector, k, query_filter=None):
+            return client.query_points(collection_name=collection, query=vector, limit=k,
+                                       query_filter=query_filter, with_payload=True).points
+        return cls(embedder.embed, search_fn, version_fn=lambda: collection_version(client, collection), **kw)
+
+    # ── 무효화
+
+    def invalidate(self):
+        with self._lock:
+            self._clear_locked()
+
+    def _clear_locked(self):
+        self._entries.clear()
+        self._slot_key = [None] * self.capacity
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self._stats["invalidations"] += 1
+
+    def _check_version_locked(self, now: float):
+        if self.version_fn is None or now - self._version_checked < self.version_check_interval:
+            return
+        self._version_checked = now
+        try:
+            v = self.version_fn()
+        except Exception as e:
+            print(f"[warn] query cache version check failed: {e}")
+            return
+        if self._version is not None and v != self._version:
+            self._clear_locked()
+        self._version = v
+
+    # ── 내부 저장/제거
+
+    def _evict_locked(self, key: Tuple):
+        e = self._entries.pop(key)
+        self._slot_key[e.slot] = None
+        self._free.append(e.slot)
+
+    def _put_locked(self, key: Tuple, vec: np.ndarray, results: Any, now: float):
+        if key in self._entries:
+            self._evict_locked(key)
+        if not self._free:
+            self._evict_locked(next(iter(self._entries)))  # LRU
+            self._stats["evictions"] += 1
+        slot = self._free.pop()
+        if self._vecs is None or self._vecs.shape[1] != vec.shape[0]:
+            self._vecs = np.zeros((self.capacity, vec.shape[0]), dtype=np.float32)
+        self._vecs[slot] = vec
+        self._slot_key[slot] = key
+        self._entries[key] = _Entry(slot, key[1:], results, now + self.ttl)
+
+    def _nearest_locked(self, vec: np.ndarray, scope: Tuple, now: float) -> Optional[Tuple]:
+        if self._vecs is None or not self._entries:
+            return None
+        slots = np.fromiter((e.slot for e in self._entries.values()), dtype=np.int64, count=len(self._entries))
+        sims = self._vecs[slots] @ vec
+        for i in np.argsort(-sims):
+            if sims[i] < self.threshold:
+                break
+            key = self._slot_key[slots[i]]
+            e = self._entries[key]
+            if e.scope == scope and e.expires_at > now:
+                return key
+        return None
+
+    # ── 조회
+
+    def search(self, query: str, k: int = 10, query_filter: Any = None) -> Any:
+        norm = normalize_query(query)
+        key = (norm, k, filter_key(query_filter))
+        now = time.monotonic()
+
+        with self._lock:
+            self._check_version_locked(now)
+            e = self._entries.get(key)
+            if e is not None:
+                if e.expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["exact_hits"] += 1
+                    return e.results
+                self._evict_locked(key)
+
+        vec = np.asarray(self.embed_fn([query])[0], dtype=np.float32)
+        norm_len = float(np.linalg.norm(vec))
+        unit = vec / norm_len if norm_len > 0 else vec
+
+        with self._lock:
+            near = self._nearest_locked(unit, key[1:], now)
+            if near is not None:
+                self._entries.move_to_end(near)
+                self._stats["semantic_hits"] += 1
+                return self._entries[near].results
+
+        results = self.search_fn(vec.tolist(), k, query_filter)
+        with self._lock:
+            self._stats["misses"] += 1
+            self._put_locked(key, unit, results, time.monotonic())
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+            s["size"] = len(self._entries)
+        total = s["exact_hits"] + s["semantic_hits"] + s["misses"]
+        s["hit_rate"] = round((s["exact_hits"] + s["semantic_hits"]) / total, 4) if total else 0.0
+        return s
@@ -0,0 +1,112 @@
+# sharding.py
+# 목적: ingest 작업을 여러 프로세스/노드로 나눠 돌리기 위한 결정적 샤딩 + 샤드별 체크포인트
+# - 선택(샘플링)은 시드 + 상대경로 해시로 결정 → 어느 샤드에서 계산해도 같은 계획
+# - 샤드 배정: stable_hash(key) % N == i  (key = 데이터 루트 기준 상대경로)
+# - 포인트 ID 는 chunker 의 uuid5 → N 개 샤드 결과의 합 == 단일 프로세스 결과
+# - 체크포인트: 완전히 업서트된 파일 키를 샤드별 파일에 append → 재시작 시 건너뜀
+#
+# 예) python qdrant/upsert_patent_db.py --shard 0/4   (머신/프로세스마다 0..3)
+
+import os, hashlib
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def parse_shard(spec: Optional[str]) -> Tuple[int, int]:
+    """"i/N" → (i, N). 없으면 (0, 1)."""
+    if not spec:
+        return 0, 1
+    try:
+        i, n = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"--shard 형식은 i/N 입니다: {spec!r}")
+    if n < 1 or not 0 <= i < n:
+        raise ValueError(f"--shard 범위 오류: {spec!r} (0 <= i < N)")
+    return i, n
+
+
+def stable_hash(key: str, salt: str = "") -> int:
+    """프로세스/머신/파이썬 버전과 무관한 64bit 해시 (내장 hash() 는 실행마다 달라짐)."""
+    h = hashlib.blake2b(f"{salt}\x00{key}".encode("utf-8"), digest_size=8)
+    return int.from_bytes(h.digest(), "big")
+
+
+def rel_key(path: str, base: str) -> str:
+    """데이터 루트 기준 상대경로 ('/' 구분) — 노드마다 절대경로가 달라도 같은 키."""
+    return os.path.relpath(path, base).replace("\\", "/")
+
+
+def in_shard(key: str, shard: Tuple[int, int]) -> bool:
+    i, n = shard
+    return n == 1 or stable_hash(key, "shard") % n == i
+
+
+def stable_sample(items: Sequence[T], n: int, seed: Any, key: Callable[[T], str] = str) -> List[T]:
+    """random.sample 대체: 시드별 해시 순으로 n개 선택, 반환은 원래 순서 유지."""
+    if len(items) <= n:
+        return list(items)
+    ranked = sorted(range(len(items)), key=lambda i: stable_hash(key(items[i]), f"sample:{seed}"))
+    return [items[i] for i in sorted(ranked[:n])]
+
+
+def checkpoint_path(ckpt_dir: str, collection: str, shard: Tuple[int, int]) -> str:
+    i, n = shard
+    return os.path.join(ckpt_dir, f"{collection}.shard-{i}-of-{n}.done")
+
+
+class Checkpoint:
+    """샤드별 완료 파일 키 기록. record_flush() 로 업서트 결과를 순서대로 알려주면
+    한 파일의 모든 포인트가 성공적으로 올라간 뒤에만 완료로 기록한다."""
+
+    def __init__(self, path: str, enabled: bool = True, reset: bool = False):
+        self.path = path
+        self.enabled = enabled
+        self.done = set()
+        self._failed = set()
+        self._carry: Optional[str] = None  # 마지막 flush 의 마지막 파일 (다음 flush 로 이어질 수 있음)
+        if enabled and reset and os.path.exists(path):
+            os.remove(path)
+        if enabled and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.done.update(line.rstrip("\n") for line in f if line.strip())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.done
+
+    def fail(self, keys: Iterable[str]):
+        """임베딩 실패 등으로 일부 포인트가 빠진 파일 → 이번 실행에서는 완료 처리하지 않음."""
+        self._failed.update(keys)
+
+    def record_flush(self, keys: Sequence[str], ok: bool):
+        """업서트 1회에 포함된 포인트들의 파일 키(입력 순서 그대로)."""
+        ordered = list(dict.fromkeys(keys))
+        if not ok:
+            self._failed.update(ordered)
+        complete = []
+        if self._carry is not None and (not ordered or ordered[0] != self._carry):
+            complete.append(self._carry)
+        self._carry = None
+        if ok and ordered:
+            complete.extend(ordered[:-1])
+            self._carry = ordered[-1]
+        self._mark(complete)
+
+    def close(self):
+        """모든 레코드 처리 후 호출 — 마지막 파일까지 완료 기록."""
+        if self._carry is not None:
+            self._mark([self._carry])
+            self._carry = None
+
+    def _mark(self, keys: Iterable[str]):
+        keys = [k for k in keys if k not in self._failed and k not in self.done]
+        if not keys:
+            return
+        self.done.update(keys)
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(k + "\n" for k in keys))
+            f.flush()
+            os.fsync(f.fileno())
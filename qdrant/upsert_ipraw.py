@@ -1,9 +1,26 @@
-import os, glob, json, random, uuid
-from typing import List, Tuple
+# upsert_ipraw.py
+# 목적: 법률 QA/요약 JSON 을 임베딩 → Qdrant 의 ipraw_db 컬렉션으로 업서트
+# - 문서 포인트: [제목] + [요약] 임베딩, id = uuid5(parent_id, "<상대경로>")
+# - taskinfo.sentences 는 토큰 예산 기반 passage 로 쪼개 별도 포인트로 색인 (CHUNK_SENTENCES=0 이면 끔)
+#   parent_id = uuid5("ipraw:{kind}:{doc_id}") 로 같은 원문의 qa/summary/passage 를 묶음 (검색 시 collapse 용)
+#   · 문서 포인트는 파일 단위: 같은 doc_id 의 파일이 여러 개여도(같은 split/subkind 포함) 덮어쓰지 않음
+#   · passage 는 원문 단위: id = uuid5(parent_id, "{원문 해시}:p{chunk_index}")
+#     qa/summary 파일이 같은 sentences 를 가지면 한 번만 임베딩/저장 (payload 에 파일별 split/subkind 없음)
+# 샤딩: --shard i/N → 상대경로 해시로 파일을 나눠 N 개 프로세스/노드가 동시에 같은 컬렉션에 업서트
+#   (선택은 SEED 기반 결정적 샘플링, 샤드별 체크포인트로 재시작 시 완료 파일 건너뜀)
+
+from __future__ import annotations
+
+import os, glob, json, hashlib, argparse
+from typing import TYPE_CHECKING, List, Tuple, Dict, Any, Iterable, Iterator
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import PointStruct
-import requests
+
+from clients import get_qdrant, get_embedder
+from chunker import iter_passages, parent_uuid, child_uuid
+from sharding import parse_shard, rel_key, in_shard, stable_sample, checkpoint_path, Checkpoint
+
+if TYPE_CHECKING:
+    import numpy as np
 
 # ── env
 load_dotenv()
@@ -11,14 +28,17 @@ QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 EMBED_URL = os.getenv("EMBED_URL")
 COLLECTION = os.getenv("COLLECTION", "ipraw_db")
-
-# ── clients
-qdrant = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-
-def embed_batch(texts: List[str], timeout=120) -> List[List[float]]:
-    r = requests.post(f"{EMBED_URL}/embed", json={"texts": texts}, timeout=timeout)
-    r.raise_for_status()
-    return r.json()["embeddings"]
+BASE_DIR = os.getenv("IPRAW_BASE", "unzip_data/ip/dataset")
+SEED = int(os.getenv("SEED", "42"))
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", ".ckpt")
+CHUNK_SENTENCES = os.getenv("CHUNK_SENTENCES", "1") != "0"
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "48"))
+
+# ── clients: 첫 호출 때 생성 (clients.py) → import 만으로는 연결/무거운 import 없음
+def embed_batch(texts: List[str]) -> np.ndarray:
+    """(len(texts), dim) 연속 배열"""
+    return get_embedder(EMBED_URL).embed(texts)
 
 def list_files(base: str, kind: str, sub: str, split: str) -> List[str]:
     """kind/sub(split)/files → 존재하는 경로만"""
@@ -35,8 +55,8 @@ def sample_by_sources(base: str, kind: str, split: str, sources: List[str], per_
         if len(files) == 0:
             print(f"[warn] no files: {kind}/{sub}/{split}")
             continue
-        n = min(per_source, len(files))
-        chosen = random.sample(files, n) if len(files) > n else files
+        # SEED + 상대경로 해시 → 어느 샤드/머신에서든 같은 선택
+        chosen = stable_sample(files, per_source, SEED, key=lambda p: rel_key(p, base))
         picked.extend((p, kind, sub, split) for p in chosen)
         if len(files) < per_source:
             print(f"[warn] {kind}/{sub}/{split} {len(files)}개만 존재 (요청 {per_source})")
@@ -67,6 +87,54 @@ def to_payload(doc: dict, kind: str, subkind: str, split: str) -> dict:
         "split": split,         # train / val
     }
 
+def parent_key(doc: dict, kind: str, path: str) -> str:
+    """같은 원문(doc_id)의 qa/summary 를 하나의 부모로 묶는 결정적 키."""
+    doc_id = (doc.get("info") or {}).get("doc_id")
+    return f"ipraw:{kind}:{doc_id}" if doc_id else "ipraw:path:" + rel_key(path, BASE_DIR)
+
+def source_hash(payload: Dict[str, Any]) -> str:
+    """passage 포인트의 내용(임베딩 텍스트 + payload)을 결정하는 원문 필드의 해시."""
+    src = [payload.get(k) for k in ("title", "response_institute", "response_date", "sentences")]
+    return hashlib.sha1(json.dumps(src, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def iter_records(tasks: Iterable[Tuple[str, str, str, str]]) -> Iterator[Tuple[str, str, Dict[str, Any], str]]:
+    """(path, kind, subkind, split) → (point_id, embed_text, payload, file_key) 스트림.
+    파일 1개당 문서 포인트 1개 + sentences passage 포인트 N개 (이번 실행에서 이미 낸 원문이면 생략)."""
+    seen_sources = set()
+    for (path, kind, sub, split) in tasks:
+        try:
+            d = load_doc(path)
+        except Exception as e:
+            print(f"[err] load {path}: {e}")
+            continue
+        fkey = rel_key(path, BASE_DIR)
+        key = parent_key(d, kind, path)
+        pid = parent_uuid(key)
+        payload = to_payload(d, kind, sub, split)
+        payload["parent_id"] = pid
+        payload["point_type"] = "doc"
+        yield child_uuid(pid, fkey), to_text_for_embed(d), payload, fkey
+
+        if not CHUNK_SENTENCES:
+            continue
+        src = source_hash(payload)
+        if (pid, src) in seen_sources:
+            continue
+        seen_sources.add((pid, src))
+        title = payload.get("title") or ""
+        for psg in iter_passages(key, payload.get("sentences"), CHUNK_MAX_TOKENS, CHUNK_OVERLAP):
+            yield child_uuid(pid, f"{src}:p{psg['chunk_index']}"), f"[제목] {title}\n[본문] {psg['passage']}", {
+                "doc_id": payload["doc_id"],
+                "response_institute": payload["response_institute"],
+                "response_date": payload["response_date"],
+                "title": payload["title"],
+                "kind": kind,
+                "parent_id": pid,
+                "point_type": "passage",
+                "chunk_index": psg["chunk_index"],
+                "passage": psg["passage"],
+            }, fkey
+
 def batch(iterable, size):
     buf = []
     for x in iterable:
@@ -77,8 +145,28 @@ def batch(iterable, size):
     if buf:
         yield buf
 
-def main():
-    base = "unzip_data/ip/dataset"
+def upsert_points(ids: List[str], vectors: np.ndarray, payloads: List[Dict[str, Any]], batch_size: int) -> bool:
+    try:
+        # numpy 배열 그대로 전달 → 클라이언트가 전송 배치 단위로만 직렬화
+        get_qdrant(QDRANT_URL, QDRANT_API_KEY).upload_collection(collection_name=COLLECTION, vectors=vectors, payload=payloads, ids=ids,
+                                 batch_size=batch_size, wait=True)
+        print(f"[ok] upserted {len(ids)} points")
+        return True
+    except Exception as e:
+        print(f"[err] upsert batch ({len(ids)}): {e}")
+        return False
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="ip legal JSON → ipraw_db upsert")
+    ap.add_argument("--shard", default=os.getenv("SHARD"), help="i/N: 이 프로세스가 맡을 샤드 (기본 0/1)")
+    ap.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    ap.add_argument("--no-checkpoint", action="store_true", help="체크포인트 읽기/쓰기 안 함")
+    ap.add_argument("--reset-checkpoint", action="store_true", help="이 샤드의 체크포인트 삭제 후 처음부터")
+    args = ap.parse_args(argv)
+    shard = parse_shard(args.shard)
+    from point_buffer import PointBuffer  # numpy
+
+    base = BASE_DIR
     kinds = ["judgment", "statute", "trial_decision", "decision", "interpretation"]
 
     # 요구사항:
@@ -91,65 +179,58 @@ def main():
         else:
             plan[k] = {"sources": ["qa", "summary"], "per_source": 500}
 
-    # 수집 대상 파일 나열
-    tasks: List[Tuple[str, str, str, str]] = []  # (path, kind, subkind, split)
+    # 수집 대상 파일 나열 (전체 계획은 샤드와 무관하게 동일)
+    planned: List[Tuple[str, str, str, str]] = []  # (path, kind, subkind, split)
     for k in kinds:
         sources = plan[k]["sources"]
         per_source = plan[k]["per_source"]
         for split in ["train", "val"]:
             picks = sample_by_sources(base, k, split, sources, per_source)
-            tasks.extend(picks)
+            planned.extend(picks)
 
-    print(f"[info] total selected files = {len(tasks)}")
+    # 이 샤드 몫 + 체크포인트에 없는 것만
+    ckpt = Checkpoint(checkpoint_path(args.checkpoint_dir, COLLECTION, shard),
+                      enabled=not args.no_checkpoint, reset=args.reset_checkpoint)
+    mine = [t for t in planned if in_shard(rel_key(t[0], base), shard)]
+    tasks = [t for t in mine if rel_key(t[0], base) not in ckpt]
+
+    print(f"[info] total selected files = {len(planned)} → shard {shard[0]}/{shard[1]}: "
+          f"{len(mine)} (done {len(mine) - len(tasks)}, to process {len(tasks)})")
 
     # ---- 업서트: 임베딩을 배치로, 업서트도 배치로
     BATCH_EMBED = 64
     BATCH_UPSERT = 256
 
-    to_upsert: List[PointStruct] = []
-    for task_batch in batch(tasks, BATCH_EMBED):
-        # 1) 로드 & 임베딩 입력 준비
-        docs = []
-        texts = []
-        metas = []
-        for (path, kind, sub, split) in task_batch:
-            try:
-                d = load_doc(path)
-                docs.append(d)
-                texts.append(to_text_for_embed(d))
-                metas.append((kind, sub, split))
-            except Exception as e:
-                print(f"[err] load {path}: {e}")
-
-        # 2) 임베딩
+    pending = PointBuffer()
+
+    def flush():
+        ids, vectors, payloads, fkeys = pending.take()
+        ok = upsert_points(ids, vectors, payloads, BATCH_UPSERT)
+        ckpt.record_flush(fkeys, ok=ok)
+
+    for rec_batch in batch(iter_records(tasks), BATCH_EMBED):
+        # 1) 임베딩 (문서 + passage 를 같은 배치로) → (n, dim) ndarray
+        texts = [r[1] for r in rec_batch]
+        fkeys = [r[3] for r in rec_batch]
         try:
             vectors = embed_batch(texts)
         except Exception as e:
-            print(f"[err] embed batch failed ({len(texts)} docs): {e}")
+            print(f"[err] embed batch failed ({len(texts)} points): {e}")
+            ckpt.fail(fkeys)
             continue
 
-        # 3) PointStruct 생성
-        for d, vec, meta in zip(docs, vectors, metas):
-            kind, sub, split = meta
-            payload = to_payload(d, kind, sub, split)
-            to_upsert.append(PointStruct(
-                id=str(uuid.uuid4()),
-                vector=vec,
-                payload=payload
-            ))
-
-        # 4) 업서트 (적당한 크기로 쪼개서)
-        for up_batch in batch(to_upsert, BATCH_UPSERT):
-            try:
-                qdrant.upsert(collection_name=COLLECTION, points=up_batch)
-                print(f"[ok] upserted {len(up_batch)} points (total so far)")
-            except Exception as e:
-                print(f"[err] upsert batch ({len(up_batch)}): {e}")
-            finally:
-                # 비운 것만 제거
-                to_upsert = to_upsert[len(up_batch):]
-
-    print("[done] 업서트 완료")
+        # 2) 벡터는 배열 블록 그대로 버퍼링
+        pending.add([r[0] for r in rec_batch], vectors, [r[2] for r in rec_batch], fkeys)
+
+        # 3) 업서트 (적당한 크기로 쪼개서)
+        if len(pending) >= BATCH_UPSERT:
+            flush()
+
+    if len(pending):
+        flush()
+    ckpt.close()
+
+    print(f"[done] 업서트 완료 (shard {shard[0]}/{shard[1]}, files done={len(ckpt.done)})")
 
 if __name__ == "__main__":
     main()
@@ -8,13 +8,30 @@
 #   [요약] {abstract}
 #   [주요키워드] {keyword_csv}
 # 메타데이터(payload): register_date, open_date, application_date, documentId, title, claims (+ split, source, path)
-
-import os, glob, json, random, uuid, time
-from typing import List, Dict, Any, Iterable, Tuple
+#   + 파생 필드(patent_fields.derive_fields): ipc_section/class/subclass/main/all, applicant_name,
+#     *_year(INTEGER), *_at(DATETIME) → schemas/patent_db.json 인덱스로 범위/IPC 필터
+# 청구항(claims)은 토큰 예산 기반 passage 로 쪼개 별도 포인트로도 색인 (CHUNK_CLAIMS=0 이면 끔)
+#   - 문서 포인트 id = parent_id = uuid5(documentId), passage id = uuid5(parent_id, "p{idx}")
+#   - 검색 시 chunker.search_collapsed 로 특허당 1건만 반환
+# 샤딩: --shard i/N → 문서 키(parent_key) 해시로 파일을 나눠 N 개 프로세스/노드가 동시에 같은 컬렉션에 업서트
+#   - 포인트 id 가 documentId 기준이라, 같은 documentId 파일(train/val, 다른 소스 폴더)은 같은 샤드가
+#     단일 실행과 같은 순서로 처리 → 최종 payload / 남는 passage 가 실행 타이밍과 무관
+#   - N > 1 이면 계획 단계에서 선택된 파일의 documentId 를 읽음 (N = 1 이면 생략)
+#   (선택은 SEED 기반 결정적 샘플링, 샤드별 체크포인트로 재시작 시 완료 파일 건너뜀)
+
+from __future__ import annotations
+
+import os, glob, json, argparse
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Iterator, Tuple
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import PointStruct
-import requests
+
+from clients import get_qdrant, get_embedder
+from chunker import iter_passages, parent_uuid
+from patent_fields import derive_fields
+from sharding import parse_shard, rel_key, in_shard, stable_sample, checkpoint_path, Checkpoint
+
+if TYPE_CHECKING:
+    import numpy as np
 
 # ── env
 load_dotenv()
@@ -27,38 +44,20 @@ PER_SOURCE = int(os.getenv("PER_SOURCE", "500"))  # 소스(폴더)당 최대 개
 BATCH_EMBED = int(os.getenv("BATCH_EMBED", "64"))
 BATCH_UPSERT = int(os.getenv("BATCH_UPSERT", "256"))
 SEED = int(os.getenv("SEED", "42"))
+CHUNK_CLAIMS = os.getenv("CHUNK_CLAIMS", "1") != "0"
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "48"))
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", ".ckpt")
 
-random.seed(SEED)
-
-# ── clients
-qdrant = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-
-# ── helpers
+# ── helpers (클라이언트는 첫 호출 때 생성 — clients.py)
 
 def ping_embed() -> bool:
-    try:
-        r = requests.get(f"{EMBED_URL}/ping", timeout=8)
-        return r.ok and r.json().get("status") == "ok"
-    except Exception:
-        return False
+    return get_embedder(EMBED_URL).ping()
 
 
-def embed_batch(texts: List[str], timeout=120, max_retries=3, backoff=2.0) -> List[List[float]]:
-    """임베딩 서버 배치 호출 (간단한 재시도 포함)."""
-    for attempt in range(1, max_retries + 1):
-        try:
-            r = requests.post(f"{EMBED_URL}/embed", json={"texts": texts}, timeout=timeout)
-            r.raise_for_status()
-            data = r.json()
-            if "embeddings" not in data:
-                raise RuntimeError("/embed 응답에 'embeddings' 없음")
-            return data["embeddings"]
-        except Exception as e:
-            if attempt >= max_retries:
-                raise
-            sleep_s = backoff ** attempt
-            print(f"[warn] embed retry {attempt}/{max_retries} after error: {e} → sleep {sleep_s:.1f}s")
-            time.sleep(sleep_s)
+def embed_batch(texts: List[str]) -> np.ndarray:
+    """임베딩 서버 배치 호출 → (len(texts), dim) 배열 (EmbedClient 가 재시도 포함)."""
+    return get_embedder(EMBED_URL).embed(texts)
 
 
 def list_sources(split_dir: str) -> List[str]:
@@ -75,7 +74,7 @@ def list_jsons_in_dir(dirpath: str) -> List[str]:
 
 
 def pick_files_per_source(split_dir: str, per_source: int) -> List[Tuple[str, str]]:
-    """각 소스(폴더)에서 최대 per_source개 샘플링.
+    """각 소스(폴더)에서 최대 per_source개 샘플링 (SEED + 상대경로 해시 → 어느 샤드에서든 같은 선택).
     반환: (filepath, source_name)
     """
     picked: List[Tuple[str, str]] = []
@@ -85,8 +84,7 @@ def pick_files_per_source(split_dir: str, per_source: int) -> List[Tuple[str, st
         if not files:
             print(f"[warn] empty source: {source_name}")
             continue
-        n = min(per_source, len(files))
-        chosen = random.sample(files, n) if len(files) > n else files
+        chosen = stable_sample(files, per_source, SEED, key=lambda p: rel_key(p, BASE_DIR))
         picked.extend((p, source_name) for p in chosen)
         if len(files) < per_source:
             print(f"[warn] {source_name}: {len(files)}개만 존재 (요청 {per_source})")
@@ -136,10 +134,52 @@ def build_payload(pat: Dict[str, Any], *, split: str, source: str, path: str) ->
         "source": source,
         "path": path.replace("\\", "/"),
     }
-    # 필요 시 확장: ipc_* 등 추가 가능
+    # 인덱싱된 필터 필드: IPC 계층, 출원인, 연도/날짜(범위 검색용)
+    payload.update(derive_fields(pat))
     return payload
 
 
+def parent_key(pat: Dict[str, Any], path: str) -> str:
+    """특허 문서의 결정적 키 (documentId 우선, 없으면 경로)."""
+    doc_id = pat.get("documentId")
+    return f"patent:{doc_id}" if doc_id else "patent:path:" + rel_key(path, BASE_DIR)
+
+
+def shard_key(fp: str) -> str:
+    """샤드 배정 키 = 포인트 id 를 정하는 문서 키. 읽기 실패 파일은 경로 키 (iter_records 에서도 건너뜀)."""
+    try:
+        return parent_key(load_doc(fp), fp)
+    except Exception:
+        return "patent:path:" + rel_key(fp, BASE_DIR)
+
+
+def iter_records(tasks: Iterable[Tuple[str, str, str]]) -> Iterator[Tuple[str, str, Dict[str, Any], str]]:
+    """(filepath, split, source) → (point_id, embed_text, payload, file_key) 스트림.
+    문서 1건당 문서 포인트 1개 + 청구항 passage 포인트 N개."""
+    for fp, split, src in tasks:
+        try:
+            pat = load_doc(fp)
+        except Exception as e:
+            print(f"[err] load {fp}: {e}")
+            continue
+        fkey = rel_key(fp, BASE_DIR)
+        payload = build_payload(pat, split=split, source=src, path=fp)
+        key = parent_key(pat, fp)
+        pid = parent_uuid(key)
+        payload["parent_id"] = pid
+        payload["point_type"] = "doc"
+        yield pid, build_embed_text(pat), payload, fkey
+
+        if not CHUNK_CLAIMS:
+            continue
+        title = norm_str(pat.get("invention_title") or pat.get("title"))
+        for psg in iter_passages(key, pat.get("claims"), CHUNK_MAX_TOKENS, CHUNK_OVERLAP):
+            # passage 도 같은 필터(IPC/연도 등)로 걸리도록 문서 payload 를 복사 (긴 claims 원문은 제외)
+            psg_payload = {k: v for k, v in payload.items() if k != "claims"}
+            psg_payload.update(point_type="passage", chunk_index=psg["chunk_index"], passage=psg["passage"])
+            yield psg["id"], f"[발명의명칭] {title}\n[청구항] {psg['passage']}", psg_payload, fkey
+
+
 def batched(it: Iterable[Any], size: int) -> Iterable[List[Any]]:
     buf: List[Any] = []
     for x in it:
@@ -151,72 +191,88 @@ def batched(it: Iterable[Any], size: int) -> Iterable[List[Any]]:
         yield buf
 
 
-def main():
+def upsert_points(ids: List[str], vectors: np.ndarray, payloads: List[Dict[str, Any]], processed: int) -> int:
+    try:
+        # numpy 배열 그대로 전달 → 클라이언트가 전송 배치 단위로만 직렬화
+        get_qdrant(QDRANT_URL, QDRANT_API_KEY).upload_collection(collection_name=COLLECTION, vectors=vectors, payload=payloads, ids=ids,
+                                 batch_size=BATCH_UPSERT, wait=True)
+        print(f"[ok] upserted {len(ids)} (total={processed + len(ids)})")
+        return len(ids)
+    except Exception as e:
+        print(f"[err] upsert batch ({len(ids)}): {e}")
+        return 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="patent JSON → patent_db upsert")
+    ap.add_argument("--shard", default=os.getenv("SHARD"), help="i/N: 이 프로세스가 맡을 샤드 (기본 0/1)")
+    ap.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    ap.add_argument("--no-checkpoint", action="store_true", help="체크포인트 읽기/쓰기 안 함")
+    ap.add_argument("--reset-checkpoint", action="store_true", help="이 샤드의 체크포인트 삭제 후 처음부터")
+    args = ap.parse_args(argv)
+    shard = parse_shard(args.shard)
+    from point_buffer import PointBuffer  # numpy
+
     if not ping_embed():
         raise SystemExit(f"[err] 임베딩 서버 ping 실패: {EMBED_URL}")
 
+    ckpt = Checkpoint(checkpoint_path(args.checkpoint_dir, COLLECTION, shard),
+                      enabled=not args.no_checkpoint, reset=args.reset_checkpoint)
+
     total_files = 0
     tasks: List[Tuple[str, str, str]] = []  # (filepath, split, source)
     for split in ("train", "val"):
         split_dir = os.path.join(BASE_DIR, split)
         picks = pick_files_per_source(split_dir, PER_SOURCE)
-        tasks.extend((fp, split, src) for fp, src in picks)
-        total_files += len(picks)
-        print(f"[info] {split}: picked {len(picks)} files from {len(list_sources(split_dir))} sources")
+        mine = [(fp, src) for fp, src in picks if shard[1] == 1 or in_shard(shard_key(fp), shard)]
+        todo = [(fp, src) for fp, src in mine if rel_key(fp, BASE_DIR) not in ckpt]
+        tasks.extend((fp, split, src) for fp, src in todo)
+        total_files += len(mine)
+        print(f"[info] {split}: picked {len(picks)} files from {len(list_sources(split_dir))} sources"
+              f" → shard {shard[0]}/{shard[1]}: {len(mine)} (done {len(mine) - len(todo)})")
 
     if total_files == 0:
         raise SystemExit(f"[err] 선택된 파일이 없습니다. BASE_DIR 확인: {BASE_DIR}")
 
-    print(f"[info] total selected files = {total_files}")
+    print(f"[info] total selected files = {total_files}, to process = {len(tasks)}")
 
-    pending: List[PointStruct] = []
+    pending = PointBuffer()
     processed = 0
 
-    for task_batch in batched(tasks, BATCH_EMBED):
-        docs: List[Dict[str, Any]] = []
-        texts: List[str] = []
-        metas: List[Tuple[str, str, str]] = []  # (split, source, path)
-
-        # 1) 로드 & 텍스트 구성
-        for fp, split, src in task_batch:
-            try:
-                pat = load_doc(fp)
-                txt = build_embed_text(pat)
-                docs.append(pat)
-                texts.append(txt)
-                metas.append((split, src, fp))
-            except Exception as e:
-                print(f"[err] load {fp}: {e}")
-
-        if not texts:
-            continue
-
-        # 2) 임베딩
+    def flush():
+        nonlocal processed
+        ids, vecs, payloads, fkeys = pending.take()
+        n = upsert_points(ids, vecs, payloads, processed)
+        processed += n
+        ckpt.record_flush(fkeys, ok=n > 0)
+
+    # 문서/청구항 passage 를 스트리밍으로 만들어 임베딩 배치 크기에 맞춰 처리
+    for rec_batch in batched(iter_records(tasks), BATCH_EMBED):
+        ids = [r[0] for r in rec_batch]
+        texts = [r[1] for r in rec_batch]
+        payloads = [r[2] for r in rec_batch]
+        fkeys = [r[3] for r in rec_batch]
+
+        # 1) 임베딩 → (n, dim) ndarray
         try:
             vecs = embed_batch(texts)
         except Exception as e:
             print(f"[err] embed failed for batch({len(texts)}): {e}")
+            ckpt.fail(fkeys)
             continue
 
-        # 3) PointStruct 생성
-        for pat, vec, (split, src, fp) in zip(docs, vecs, metas):
-            payload = build_payload(pat, split=split, source=src, path=fp)
-            point = PointStruct(id=str(uuid.uuid4()), vector=vec, payload=payload)
-            pending.append(point)
-
-        # 4) 업서트(배치)
-        for up_batch in batched(pending, BATCH_UPSERT):
-            try:
-                qdrant.upsert(collection_name=COLLECTION, points=up_batch)
-                processed += len(up_batch)
-                print(f"[ok] upserted {len(up_batch)} (total={processed})")
-            except Exception as e:
-                print(f"[err] upsert batch ({len(up_batch)}): {e}")
-            finally:
-                # 사용한 만큼 비우기
-                pending = pending[len(up_batch):]
-
-    print(f"[done] 업서트 완료: total={processed}")
+        # 2) 벡터는 배열 블록 그대로 버퍼링
+        pending.add(ids, vecs, payloads, fkeys)
+
+        # 3) 업서트(배치)
+        if len(pending) >= BATCH_UPSERT:
+            flush()
+
+    if len(pending):
+        flush()
+    ckpt.close()
+
+    print(f"[done] 업서트 완료: total={processed} (shard {shard[0]}/{shard[1]}, files done={len(ckpt.done)})")
 
 
 if __name__ == "__main__":
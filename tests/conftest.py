@@ -0,0 +1,8 @@
+# 스크립트 폴더(qdrant/, tools/, unzip_data/)는 패키지가 아니라 형제 import 를 쓰므로 경로만 추가
+import os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("qdrant", "tools", "unzip_data"):
+    path = os.path.join(ROOT, sub)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,70 @@
+import json
+import itertools
+
+import pytest
+
+import add_web_search as aws
+
+RETRIEVE = {"intent": "patent_info", "action": "retrieve", "jurisdiction": "KR", "confidence": 0.7}
+WEB = {"intent": "patent_info", "action": "web_search", "jurisdiction": "unknown", "confidence": 0.65}
+
+
+def row(i, resp):
+    return json.dumps({"messages": [{"role": "user", "content": f"질의 {i}"}],
+                       "response": resp if isinstance(resp, str) else json.dumps(resp)}, ensure_ascii=False)
+
+
+@pytest.fixture
+def clustered(tmp_path):
+    """retrieve 9,000 줄 뒤에 web_search 1,000 줄 (+ 응답이 잘못된 줄 몇 개)."""
+    path = tmp_path / "train.jsonl"
+    lines = [row(i, RETRIEVE) for i in range(9000)] + [row(i, "not json") for i in range(7)]
+    lines += [row(i, WEB) for i in range(1000)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def actions(path):
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            out.append(json.loads(json.loads(line)["response"])["action"])
+    return out
+
+
+@pytest.mark.parametrize("mix", [aws.mix_stream, aws.mix_shuffled])
+def test_exact_synth_count_with_clustered_web_search(clustered, tmp_path, mix):
+    out = tmp_path / "mixed.jsonl"
+    st = mix(str(clustered), str(out), target_ratio=0.15, seed=1)
+    assert (st["src"], st["src_web_search"], st["synth"]) == (10000, 1000, 588)
+    acts = actions(out)
+    assert len(acts) == 10588
+    assert acts.count("web_search") / len(acts) <= 0.15
+    assert (acts.count("web_search") + 1) / (len(acts) + 1) > 0.15    # 한 개 더 넣으면 초과
+
+
+def test_stream_spreads_synth_evenly(clustered, tmp_path):
+    out = tmp_path / "mixed.jsonl"
+    aws.mix_stream(str(clustered), str(out), target_ratio=0.15)
+    acts = actions(out)
+    head = 9000 + 9000 * 588 // 10000                     # retrieve 9,000 줄 구간 (web_search 는 전부 합성)
+    pos = [i for i, a in enumerate(acts[:head]) if a == "web_search"]
+    assert len(pos) == 9000 * 588 // 10000
+    gaps = {b - a for a, b in zip(pos, pos[1:])}           # 약 N/s = 17 줄마다 한 개
+    assert max(gaps) - min(gaps) <= 1 and 17 <= min(gaps) <= 18
+
+
+def test_iter_synth_unique_within_cycle():
+    unique = sum(aws.combo_count(t) for t in aws.TEMPLATES)
+    assert unique == 160
+    gen = aws.iter_synth(seed=7, warn=False)
+    for _ in range(2):                                    # 순열 회차마다 중복 없음
+        msgs = [s["messages"][-1]["content"] for s in itertools.islice(gen, unique)]
+        assert len(set(msgs)) == unique
+
+
+def test_synth_needed():
+    assert aws.synth_needed(10000, 1000, 0.15) == 588
+    assert aws.synth_needed(100, 50, 0.15) == 0
+    with pytest.raises(ValueError):
+        aws.synth_needed(10, 0, 1.0)
@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("qdrant_client")
+
+import bench_ipraw
+from bench_ipraw import collapse_doc_ids, score_ranking
+
+
+def test_collapsed_ranking_skips_repeated_docs():
+    # 다른 문서의 passage 들이 top-k 를 채워 정답이 밀려나는 경우
+    ranked = ["a", "a", "a", "b", "b", "gold"]
+    assert score_ranking(ranked[:5], "gold", [1, 5]) == ({1: 0, 5: 0}, 0.0)
+    assert score_ranking(collapse_doc_ids(ranked)[:5], "gold", [1, 5]) == ({1: 0, 5: 1}, 1 / 3)
+
+
+class FakeEmbedder:
+    def embed(self, texts):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def test_replica_has_doc_and_passage_points(tmp_path):
+    d = tmp_path / "judgment" / "qa" / "val"
+    d.mkdir(parents=True)
+    doc = {"info": {"doc_id": "j-1", "title": "제목"}, "taskinfo": {"output": "요약", "sentences": ["문장 하나."]}}
+    (d / "1.json").write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+    client = bench_ipraw.build_replica(FakeEmbedder(), str(tmp_path), "ipraw_db")
+    points, _ = client.scroll("ipraw_db", limit=100, with_payload=True)
+    assert sorted(p.payload["point_type"] for p in points) == ["doc", "passage"]
+    assert bench_ipraw.indexed_val_doc_ids(client, "ipraw_db") == {"j-1"}
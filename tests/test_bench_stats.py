@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import bench_ipraw
+import eval_router
+from bench_stats import percentile, latency_summary
+
+
+@pytest.mark.parametrize("p, expected", [(50, 10), (95, 19), (99, 20), (100, 20), (5, 1), (0, 1)])
+def test_nearest_rank_1_to_20(p, expected):
+    assert percentile(list(range(1, 21)), p) == expected
+
+
+def test_nearest_rank_small_and_empty():
+    assert percentile([], 95) == 0.0
+    assert percentile([7.0], 50) == 7.0
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile([1, 2, 3, 4], 75) == 3
+    assert percentile(list(range(1, 101)), 7) == 7   # 부동소수 오차로 한 칸 밀리지 않음
+
+
+def test_latency_summary():
+    s = latency_summary([float(x) for x in range(20, 0, -1)])   # 정렬 안 된 입력
+    assert s == {"p50": 10.0, "p95": 19.0, "p99": 20.0, "mean": 10.5, "max": 20.0}
+    assert latency_summary([])["p95"] == 0.0
+
+
+def test_bench_compare_baseline(tmp_path):
+    prof = {"collection": "ipraw_db", "ef": 64, "quantization": "none", "batch_size": 1}
+    base = tmp_path / "base.json"
+    base.write_text(json.dumps({"results": [{**prof, "recall@5": 0.80, "mrr@10": 0.6, "latency_ms": {"p95": 10.0}}]}))
+    ok = [{**prof, "recall@5": 0.79, "mrr@10": 0.6, "latency_ms": {"p95": 12.0}}]
+    bad = [{**prof, "recall@5": 0.70, "mrr@10": 0.6, "latency_ms": {"p95": 13.0}}]
+    assert bench_ipraw.compare_baseline(ok, str(base), 0.02, 0.25) == []
+    problems = bench_ipraw.compare_baseline(bad, str(base), 0.02, 0.25)
+    assert len(problems) == 2 and "recall@5" in problems[0] and "p95" in problems[1]
+
+
+def test_eval_compare_baseline(tmp_path):
+    acc = {k: 0.9 for k in eval_router.LABELS}
+    base = tmp_path / "base.json"
+    base.write_text(json.dumps({"result": {"accuracy": acc, "json_valid_rate": 1.0, "latency_ms": {"p95": 100.0}}}))
+    rep = {"accuracy": dict(acc, action=0.85), "json_valid_rate": 0.995, "latency_ms": {"p95": 130.0}}
+    problems = eval_router.compare_baseline(rep, str(base), 0.01, 0.25)
+    assert problems == ["accuracy[action]: 0.9 → 0.85", "latency p95: 100.0ms → 130.0ms"]
@@ -0,0 +1,32 @@
+from chunker import chunk_units, approx_tokens
+
+CLAIM = ("청구항 {i} 제1항에 있어서, 상기 회로부는 입력 신호를 증폭하여 출력하는 증폭기와 상기 증폭기의 출력을 "
+         "필터링하는 필터와 상기 필터의 출력을 디지털 신호로 변환하는 변환기를 포함하며 상기 변환기는 "
+         "기준 전압을 생성하는 기준부를 포함하는 것을 특징으로 하는 장치.")
+
+
+def shared_prefix(prev, nxt, min_chars=10):
+    """nxt 의 앞부분이 prev 의 끝부분과 겹치는 길이."""
+    for k in range(min(len(prev), len(nxt)), min_chars - 1, -1):
+        if prev.endswith(nxt[:k]):
+            return k
+    return 0
+
+
+def test_long_single_sentence_claims_overlap():
+    claims = [CLAIM.format(i=i) for i in range(1, 9)]
+    assert approx_tokens(claims[0]) > 48                  # 한 청구항이 overlap 예산보다 큼
+    passages = list(chunk_units(claims, max_tokens=256, overlap_tokens=48))
+    assert len(passages) > 2
+    for prev, nxt in zip(passages, passages[1:]):
+        assert shared_prefix(prev, nxt) > 0
+        assert approx_tokens(prev) <= 256
+    assert approx_tokens(passages[-1]) <= 256
+
+
+def test_short_units_keep_whole_sentences():
+    units = [f"문장 {i} 입니다." for i in range(100)]
+    passages = list(chunk_units(units, max_tokens=40, overlap_tokens=10))
+    for prev, nxt in zip(passages, passages[1:]):
+        first = nxt.split(" 입니다.")[0] + " 입니다."
+        assert first in prev                              # 겹치는 부분이 문장 단위 그대로
@@ -0,0 +1,137 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("qdrant_client")
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+import upsert_ipraw
+import upsert_patent_db
+
+DIM = 8
+
+
+def write_doc(base, kind, sub, split, name, doc_id, title, sentences=None):
+    d = base / kind / sub / split
+    d.mkdir(parents=True, exist_ok=True)
+    doc = {"info": {"doc_id": doc_id, "title": title, "document_type": "특허법원", "decision_date": "20200101"},
+           "taskinfo": {"output": f"{title} {sub} 요약",
+                        "sentences": sentences or [f"{title} 문장 {i}" for i in range(3)]}}
+    (d / f"{name}.json").write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+
+
+@pytest.fixture
+def ingest(tmp_path, monkeypatch):
+    base = tmp_path / "dataset"
+    # 같은 doc_id 를 가진 파일 두 개 (같은 kind/subkind/split)
+    write_doc(base, "judgment", "qa", "train", "a", "judgment-1", "첫 번째 질의")
+    write_doc(base, "judgment", "qa", "train", "b", "judgment-1", "두 번째 질의")
+    write_doc(base, "judgment", "summary", "train", "c", "judgment-1", "요약본")
+    write_doc(base, "judgment", "qa", "val", "d", "judgment-2", "다른 문서")
+    # 같은 doc_id 의 qa/summary 가 같은 원문(sentences) → passage 는 한 벌만
+    long_text = [f"판결 이유 {i} 번째 문장으로 상당히 길게 이어지는 설명입니다." for i in range(40)]
+    write_doc(base, "judgment", "qa", "val", "e", "judgment-3", "같은 원문", long_text)
+    write_doc(base, "judgment", "summary", "val", "f", "judgment-3", "같은 원문", long_text)
+    # 샤드 비교용: doc_id 가 겹치는 파일 여러 개 (kind/split 에 걸쳐)
+    for i in range(12):
+        write_doc(base, "decision", "qa" if i % 2 else "summary", "train" if i % 3 else "val",
+                  f"x{i}", f"decision-{i % 4}", f"결정 {i}")
+
+    monkeypatch.setattr(upsert_ipraw, "BASE_DIR", str(base))
+    embedded = []
+
+    def embed_batch(texts):
+        embedded.extend(texts)
+        return np.ones((len(texts), DIM), dtype=np.float32)
+
+    monkeypatch.setattr(upsert_ipraw, "embed_batch", embed_batch)
+
+    def run(*shards):
+        """shards 를 차례로 같은 컬렉션에 업서트 → 전체 포인트."""
+        client = QdrantClient(":memory:")
+        client.create_collection(upsert_ipraw.COLLECTION,
+                                 vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE))
+        monkeypatch.setattr(upsert_ipraw, "get_qdrant", lambda url=None, key=None: client)
+        for shard in shards or ("0/1",):
+            upsert_ipraw.main(["--no-checkpoint", "--shard", shard])
+        points, _ = client.scroll(upsert_ipraw.COLLECTION, limit=1000, with_payload=True)
+        return points
+
+    run.embedded = embedded
+    return run
+
+
+def test_same_doc_id_files_do_not_overwrite(ingest):
+    points = ingest()
+    docs = [p for p in points if p.payload["point_type"] == "doc"]
+    titles = sorted(p.payload["title"] for p in docs if p.payload["kind"] == "judgment")
+    assert titles == ["같은 원문", "같은 원문", "다른 문서", "두 번째 질의", "요약본", "첫 번째 질의"]
+    assert len(docs) == 18
+    # collapse 용 parent_id 는 doc_id 단위로 공유
+    same = [p for p in docs if p.payload["doc_id"] == "judgment-1"]
+    assert len({p.payload["parent_id"] for p in same}) == 1
+    passages = [p for p in points if p.payload["point_type"] == "passage"]
+    assert len({p.payload["title"] for p in passages}) == 17
+
+
+def test_identical_source_text_embedded_once(ingest):
+    points = ingest()
+    psg = [p for p in points if p.payload["point_type"] == "passage" and p.payload["doc_id"] == "judgment-3"]
+    assert len(psg) > 1
+    assert sorted(p.payload["chunk_index"] for p in psg) == list(range(len(psg)))
+    embedded_psg = [t for t in ingest.embedded if t.startswith("[제목] 같은 원문\n[본문]")]
+    assert len(embedded_psg) == len(psg)
+
+
+def test_sharded_ingest_matches_single(ingest):
+    single = {p.id: p.payload for p in ingest("0/1")}
+    sharded = {p.id: p.payload for p in ingest("0/3", "1/3", "2/3")}
+    assert sharded == single
+    assert sum(p["point_type"] == "doc" for p in single.values()) == 18
+
+
+def write_patent(base, split, source, name, doc_id, n_claims):
+    d = base / split / source
+    d.mkdir(parents=True, exist_ok=True)
+    claims = " ".join(f"청구항 {i}. 제1항에 있어서 상기 회로부는 입력 신호를 증폭하는 장치{i}." for i in range(1, n_claims + 1))
+    pat = {"documentId": doc_id, "invention_title": f"장치 {doc_id}", "abstract": "요약", "ipc": "G06F 17/30",
+           "application_date": "20190103", "claims": claims}
+    (d / f"{name}.json").write_text(json.dumps({"dataset": pat}, ensure_ascii=False), encoding="utf-8")
+
+
+@pytest.fixture
+def ingest_patent(tmp_path, monkeypatch):
+    base = tmp_path / "patent"
+    # 같은 documentId 가 train/val, 다른 소스 폴더에 걸쳐 있고 청구항 길이(→ passage 수)도 다름
+    for i in range(12):
+        write_patent(base, "train", "srcA", f"a{i}", f"1{i % 9:02d}", 3 + i)
+        write_patent(base, "train", "srcB", f"b{i}", f"1{(i + 2) % 9:02d}", 30 - i)
+        write_patent(base, "val", "srcA", f"v{i}", f"1{(i + 4) % 9:02d}", 5 + 2 * i)
+
+    monkeypatch.setattr(upsert_patent_db, "BASE_DIR", str(base))
+    monkeypatch.setattr(upsert_patent_db, "CHUNK_MAX_TOKENS", 64)
+    monkeypatch.setattr(upsert_patent_db, "CHUNK_OVERLAP", 16)
+    monkeypatch.setattr(upsert_patent_db, "ping_embed", lambda: True)
+    monkeypatch.setattr(upsert_patent_db, "embed_batch", lambda texts: np.ones((len(texts), DIM), dtype=np.float32))
+
+    def run(*shards):
+        client = QdrantClient(":memory:")
+        client.create_collection(upsert_patent_db.COLLECTION,
+                                 vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE))
+        monkeypatch.setattr(upsert_patent_db, "get_qdrant", lambda url=None, key=None: client)
+        for shard in shards:
+            upsert_patent_db.main(["--no-checkpoint", "--shard", shard])
+        points, _ = client.scroll(upsert_patent_db.COLLECTION, limit=10000, with_payload=True)
+        return {p.id: p.payload for p in points}
+
+    return run
+
+
+def test_patent_sharded_ingest_matches_single(ingest_patent):
+    single = ingest_patent("0/1")
+    assert sum(p["point_type"] == "doc" for p in single.values()) == 9
+    assert ingest_patent("0/3", "1/3", "2/3") == single
+    # 샤드 실행 순서를 바꿔도 같은 결과
+    assert ingest_patent("2/3", "0/3", "1/3") == single
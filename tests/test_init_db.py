@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+pytest.importorskip("qdrant_client")
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+import init_db
+
+
+class FakeEmbedder:
+    def __init__(self, dim, model="bge-m3"):
+        self.dim, self.model, self.probes = dim, model, 0
+
+    def info(self):
+        return {"status": "ok", "model": self.model} if self.model else {"status": "ok"}
+
+    def embed(self, texts):
+        self.probes += 1
+        return [[0.0] * self.dim for _ in texts]
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    cache = tmp_path / "embed_dim.json"
+    monkeypatch.setattr(init_db, "EMBED_DIM_CACHE", str(cache))
+    monkeypatch.setattr(init_db, "EMBED_MODEL", None)
+    emb = FakeEmbedder(8)
+    monkeypatch.setattr(init_db, "get_embedder", lambda url, timeout=15: emb)
+    return cache, emb
+
+
+def test_cache_keyed_by_served_model(env):
+    cache, emb = env
+    assert init_db.resolve_dim() == 8
+    assert json.loads(cache.read_text()) == {"bge-m3": 8}
+    # 같은 URL 에서 모델만 바뀌면 캐시를 쓰지 않고 다시 probe
+    emb.model, emb.dim = "e5-large", 16
+    assert init_db.resolve_dim() == 16
+    assert emb.probes == 2
+
+
+def test_no_model_name_is_not_cached(env):
+    cache, emb = env
+    emb.model = None
+    assert init_db.resolve_dim() == 8
+    assert not cache.exists()
+
+
+def test_stale_cache_reprobed_before_mismatch(env):
+    cache, emb = env
+    cache.write_text(json.dumps({"bge-m3": 1024}))   # 낡은 캐시
+    client = QdrantClient(":memory:")
+    client.create_collection("c", vectors_config=models.VectorParams(size=8, distance=models.Distance.COSINE))
+    schema = {"collection": "c", "vectors": {"size": "auto", "distance": "Cosine"}}
+    dim_fn = lambda model, refresh=False: init_db.resolve_dim(model, refresh=refresh)
+    assert init_db.ensure_collection(client, "c", schema, dim_fn=dim_fn)
+    assert json.loads(cache.read_text()) == {"bge-m3": 8}
+
+
+def test_real_mismatch_still_reported(env):
+    cache, emb = env
+    client = QdrantClient(":memory:")
+    client.create_collection("c", vectors_config=models.VectorParams(size=4, distance=models.Distance.COSINE))
+    schema = {"collection": "c", "vectors": {"size": "auto", "distance": "Cosine"}}
+    dim_fn = lambda model, refresh=False: init_db.resolve_dim(model, refresh=refresh)
+    assert not init_db.ensure_collection(client, "c", schema, dim_fn=dim_fn)
+    assert "c" in {c.name for c in client.get_collections().collections}
@@ -0,0 +1,32 @@
+import json
+
+from jsonl_index import JsonlIndex
+
+
+def test_line_bytes_outlive_close(tmp_path):
+    path = tmp_path / "train.jsonl"
+    rows = [{"messages": [{"role": "user", "content": f"q{i}"}],
+             "response": json.dumps({"intent": "process", "action": "retrieve", "jurisdiction": "KR",
+                                     "confidence": 0.7})} for i in range(5)]
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\n\n", encoding="utf-8")
+
+    idx = JsonlIndex(str(path))
+    held = [idx.line_bytes(i) for i in range(len(idx))]
+    idx.close()                                  # 들고 있는 줄이 있어도 BufferError 없음
+    assert [json.loads(b) for b in held] == rows
+
+    with JsonlIndex(str(path)) as idx:           # 저장된 인덱스 재사용
+        assert not idx.built and len(idx) == 5
+        assert idx.counts("action") == {"retrieve": 5}
+
+
+def test_view_is_zero_copy_and_released(tmp_path):
+    path = tmp_path / "train.jsonl"
+    path.write_text("\n".join(json.dumps({"i": i, "response": ""}) for i in range(3)) + "\n", encoding="utf-8")
+
+    idx = JsonlIndex(str(path))
+    for i in range(len(idx)):
+        with idx.view(i) as v:
+            assert isinstance(v, memoryview) and v.readonly
+            assert bytes(v) == idx.line_bytes(i)
+    idx.close()                                  # 모든 view 를 해제했으므로 정상 종료
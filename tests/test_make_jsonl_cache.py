@@ -0,0 +1,51 @@
+import json
+
+import make_jsonl
+from make_jsonl import ConvertCache, qa_sample
+
+
+def write_rec(path, text):
+    path.write_text(json.dumps({"info": {"taskType": "01", "document_type": "특허법원", "title": text},
+                                "taskinfo": {"input": text}}, ensure_ascii=False), encoding="utf-8")
+
+
+def test_limited_run_keeps_unseen_entries(tmp_path):
+    files = [tmp_path / f"{i}.json" for i in range(3)]
+    for i, fp in enumerate(files):
+        write_rec(fp, f"질의 {i}")
+    cache_path = str(tmp_path / ".cache" / "c.jsonl")
+
+    full = ConvertCache(cache_path)
+    for fp in files:
+        full.line(str(fp), "qa", qa_sample)
+    full.save()
+
+    limited = ConvertCache(cache_path)          # --limit 처럼 일부만 읽음
+    limited.line(str(files[0]), "qa", qa_sample)
+    limited.save()
+    assert len(ConvertCache(cache_path).entries) == 3
+
+    files[2].unlink()                           # 원본이 사라진 항목만 정리
+    again = ConvertCache(cache_path)
+    again.line(str(files[0]), "qa", qa_sample)
+    again.save()
+    assert sorted(ConvertCache(cache_path).entries) == sorted(map(str, files[:2]))
+
+
+def test_extract_fields_change_reparses(tmp_path, monkeypatch):
+    fp = tmp_path / "a.json"
+    write_rec(fp, "PCT 진입 기한")
+    cache_path = str(tmp_path / "c.jsonl")
+    c = ConvertCache(cache_path)
+    c.line(str(fp), "qa", qa_sample)
+    c.save()
+
+    c = ConvertCache(cache_path)
+    c.line(str(fp), "qa", qa_sample)
+    assert (c.n_parsed, c.n_reconverted) == (0, 0)
+
+    monkeypatch.setattr(make_jsonl, "FIELDS_VERSION", "changed")
+    monkeypatch.setattr(make_jsonl, "RULES_VERSION", "changed")
+    c = ConvertCache(cache_path)
+    c.line(str(fp), "qa", qa_sample)
+    assert (c.n_parsed, c.n_reconverted) == (1, 1)
@@ -0,0 +1,28 @@
+import json
+
+from prerouter import PreRouter, calibrate, match_rules
+
+
+def sample(user, intent, action, jur):
+    return {"messages": [{"role": "system", "content": "s"}, {"role": "user", "content": user}],
+            "response": json.dumps({"intent": intent, "action": action, "jurisdiction": jur, "confidence": 0.7})}
+
+
+def test_unresolved_jurisdiction_falls_through_without_calibration():
+    key, d = match_rules("특허 출원 기한 알려줘")
+    assert key == "process/jur?" and d["jurisdiction"] == "unknown"
+    assert PreRouter().decide("특허 출원 기한 알려줘")[1]["confidence"] < 0.9
+    key, d = match_rules("미국 출원 수수료")
+    assert key == "process" and d["jurisdiction"] == "US"
+
+
+def test_calibration_learns_jurisdiction_from_labels(tmp_path):
+    path = tmp_path / "train.jsonl"
+    rows = [sample(f"출원 기한 {i}", "process", "retrieve", "KR") for i in range(90)]
+    rows += [sample(f"출원 기한 {i}", "process", "retrieve", "unknown") for i in range(10)]
+    path.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in rows), encoding="utf-8")
+    rules = calibrate([str(path)])
+    r = rules["process/jur?"]
+    assert (r["n"], r["correct"], r["jurisdiction"]) == (100, 90, "KR")
+    _, d = PreRouter(rules).decide("심판 청구 기한")
+    assert d["jurisdiction"] == "KR"
@@ -0,0 +1,108 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import query_cache
+from query_cache import SemanticQueryCache, normalize_query
+
+VECS = {
+    "pct 기한": [1.0, 0.0, 0.0],
+    "pct 진입 기한": [0.99, 0.1, 0.0],   # 코사인 ≈ 0.995 → semantic hit
+    "수수료": [0.0, 1.0, 0.0],
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(query_cache.time, "monotonic", c)
+    return c
+
+
+@pytest.fixture
+def calls():
+    return {"embed": 0, "search": 0}
+
+
+def make_cache(calls, **kw):
+    def embed_fn(texts):
+        calls["embed"] += 1
+        return [VECS[normalize_query(t)] for t in texts]
+
+    def search_fn(vector, k, query_filter=None):
+        calls["search"] += 1
+        return [("hit", calls["search"])] * k
+
+    return SemanticQueryCache(embed_fn, search_fn, **kw)
+
+
+def test_exact_hit_skips_embed_and_search(clock, calls):
+    cache = make_cache(calls)
+    first = cache.search("PCT 기한?", k=3)
+    assert cache.search("  pct   기한 ", k=3) == first
+    assert calls == {"embed": 1, "search": 1}
+    s = cache.stats()
+    assert (s["misses"], s["exact_hits"], s["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_semantic_hit_skips_search_only(clock, calls):
+    cache = make_cache(calls)
+    first = cache.search("pct 기한", k=3)
+    assert cache.search("pct 진입 기한", k=3) == first
+    assert calls == {"embed": 2, "search": 1}
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_different_scope_or_far_query_misses(clock, calls):
+    cache = make_cache(calls)
+    cache.search("pct 기한", k=3)
+    cache.search("pct 진입 기한", k=5)                    # k 가 다르면 재사용 안 함
+    cache.search("pct 기한", k=3, query_filter={"must": []})
+    cache.search("수수료", k=3)
+    assert calls["search"] == 4
+    assert cache.stats()["misses"] == 4
+
+
+def test_ttl_expiry(clock, calls):
+    cache = make_cache(calls, ttl=10)
+    cache.search("pct 기한", k=3)
+    clock.now += 9
+    cache.search("pct 기한", k=3)
+    cache.search("pct 진입 기한", k=3)
+    assert calls["search"] == 1
+    clock.now += 2                                         # 만료 → exact/semantic 모두 재사용 안 함
+    cache.search("pct 진입 기한", k=3)
+    assert calls["search"] == 2
+    cache.search("pct 기한", k=3)                          # 방금 새로 들어간 항목으로 semantic hit
+    assert calls["search"] == 2
+    assert cache.stats()["size"] == 1                      # 만료된 exact 항목은 제거됨
+
+
+def test_lru_eviction(clock, calls):
+    cache = make_cache(calls, capacity=2)
+    cache.search("pct 기한", k=1)
+    cache.search("수수료", k=1)
+    cache.search("pct 기한", k=1)                          # 최근 사용 → 수수료가 LRU
+    cache.search("pct 기한", k=2)                          # 새 항목 → 수수료 제거
+    assert cache.stats()["evictions"] == 1
+    cache.search("수수료", k=1)
+    assert calls["search"] == 4
+
+
+def test_version_change_invalidates(clock, calls):
+    version = {"v": 1}
+    cache = make_cache(calls, version_fn=lambda: version["v"], version_check_interval=0)
+    cache.search("pct 기한", k=3)
+    cache.search("pct 기한", k=3)
+    version["v"] = 2                                       # ingest 등으로 컬렉션 변경
+    cache.search("pct 기한", k=3)
+    assert calls["search"] == 2
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,35 @@
+import zipfile
+
+import zip_extract
+
+
+def make_zip(path, n_dirs=8, per_dir=25):
+    with zipfile.ZipFile(path, "w") as zf:
+        for d in range(n_dirs):
+            for i in range(per_dir):
+                zf.writestr(f"data/d{d}/sub/{i}.json", f'{{"d": {d}, "i": {i}}}')
+    return n_dirs * per_dir
+
+
+def test_parallel_chunks_share_parent_dirs(tmp_path, monkeypatch):
+    # 작은 묶음 → 여러 워커가 같은 상위 폴더에 동시에 기록
+    monkeypatch.setattr(zip_extract, "CHUNK_FILES", 3)
+    zp = tmp_path / "a.zip"
+    n = make_zip(zp)
+    out = tmp_path / "out"
+    state = tmp_path / "state.json"
+    zip_extract.extract_archives([(str(zp), str(out))], str(state), workers=4)
+
+    files = sorted(p.relative_to(out).as_posix() for p in out.rglob("*.json"))
+    assert len(files) == n
+    assert (out / "data/d3/sub/7.json").read_text() == '{"d": 3, "i": 7}'
+    assert str(zp).replace("\\", "/") in zip_extract.load_state(str(state))
+
+
+def test_up_to_date_members_skipped(tmp_path):
+    zp = tmp_path / "a.zip"
+    make_zip(zp, n_dirs=1, per_dir=3)
+    out = tmp_path / "out"
+    assert zip_extract.extract_members(str(zp), str(out), ["data/d0/sub/0.json", "data/d0/sub/1.json"]) == (2, 0, 32)
+    (out / "data/d0/sub/1.json").write_text("changed!!!!!!!!!")
+    assert zip_extract.extract_members(str(zp), str(out), ["data/d0/sub/0.json", "data/d0/sub/1.json"]) == (1, 1, 16)
@@ -1,5 +1,22 @@
 # C:\dana\demo_dana\tools\add_web_search.py
-import json, os, random, re
+# web_search 합성 샘플 생성 + train 과 목표 비율로 믹싱
+# - 템플릿 × 슬롯 조합을 지연 열거 (조합 인덱스 → 문자열), 템플릿별 아핀 순열로 비복원 추출
+# - 관할(jurisdiction) → 템플릿 순으로 가장 적게 뽑힌 쪽을 먼저 채워 균형 유지
+# - 고유 조합을 다 쓰면 경고 후 새 순열로 반복 (필요 개수는 항상 채움)
+# - 합성 개수: 인덱스의 라벨 코드로 N(응답이 올바른 src 줄), ws 를 먼저 세어 s = floor((r·N − ws) / (1 − r))
+#   (응답이 잘못된 src 줄은 세지도, 쓰지도 않음 — 모든 믹싱 함수 공통)
+# - 기본 출력: src + 합성을 셔플 (mix_shuffled, 메모리는 줄 번호 순열만)
+# - --stream: src 순서 그대로 쓰고 합성 s 개를 약 N/s 줄마다 고르게 끼워 넣음 (mix_stream, 메모리 O(1))
+#   train.jsonl 은 카테고리/QA·요약 순으로 묶여 있으므로 순서대로 읽는 트레이너에는 기본(셔플)을 쓸 것
+# - src 는 jsonl_index(오프셋 + 라벨 인덱스, mmap)로 읽어 web_search 판별에 JSON 파싱 없음
+import json, os, sys, math, array, random, re, string, argparse, itertools
+from collections import Counter, deque
+
+from prerouter import jurisdiction_hint
+from jsonl_index import JsonlIndex, NO_LABEL
+from routing_schema import ACTIONS
+
+WS_CODE = ACTIONS.index("web_search")   # jsonl_index 라벨 코드
 
 SRC = r"C:\dana\demo_dana\data\sft\train.jsonl"
 OUT_MIX = r"C:\dana\demo_dana\data\sft\train_mixed.jsonl"
@@ -25,78 +42,211 @@ PRODUCTS = ["KIPOnet", "Patentscope", "PAIR", "Patent Center"]
 COUNTRIES = ["미국(US)", "한국(KR)", "유럽(EU)", "WIPO"]
 LAWS = ["특허법", "상표법", "디자인보호법"]
 
+SLOTS = {
+    "topic": TOPICS,
+    "kind": KINDS,
+    "org": ORGS,
+    "product": PRODUCTS,
+    "country": COUNTRIES,
+    "law": LAWS,
+}
+JUR_ORDER = ["KR", "US", "WIPO", "unknown"]   # 동률일 때 채우는 순서
+
+def template_fields(t):
+    """"{org}의 {kind}" → ["org", "kind"] (중복 제거, 등장 순)."""
+    return list(dict.fromkeys(f for _, f, _, _ in string.Formatter().parse(t) if f))
+
+def combo_count(t):
+    return math.prod(len(SLOTS[f]) for f in template_fields(t))
+
+def render(t, idx):
+    """조합 인덱스(혼합 기수) → 완성 문장. 전체 조합을 미리 만들지 않음."""
+    vals = {}
+    for f in reversed(template_fields(t)):
+        idx, r = divmod(idx, len(SLOTS[f]))
+        vals[f] = SLOTS[f][r]
+    return t.format(**vals)
+
+def affine_perm(n, rng):
+    """0..n-1 의 비복원 순열을 O(1) 메모리로: i → (a·i + b) mod n, gcd(a, n) = 1."""
+    if n <= 1:
+        return iter(range(n))
+    while True:
+        a = rng.randrange(1, n)
+        if math.gcd(a, n) == 1:
+            break
+    b = rng.randrange(n)
+    return ((a * i + b) % n for i in range(n))
+
+def make_sample(msg):
+    jur = jurisdiction_hint(msg)
+    resp = json.dumps({"intent":"patent_info","action":"web_search","jurisdiction":jur,"confidence":0.65}, ensure_ascii=False)
+    return {
+        "messages":[
+            {"role":"system","content":SYS_PROMPT},
+            {"role":"user","content":msg}
+        ],
+        "response": resp
+    }
+
+class _TemplateStream:
+    """템플릿 하나의 순열 스트림 + 관할별 대기열 (원하는 관할이 나올 때까지 앞당겨 읽은 것 보관)."""
+    def __init__(self, t, rng):
+        self.t = t
+        self.perm = affine_perm(combo_count(t), rng)
+        self.pending = {j: deque() for j in JUR_ORDER}
+        self.done = False
+
+    def take(self, jur):
+        q = self.pending[jur]
+        if q:
+            return q.popleft()
+        for idx in self.perm:
+            msg = render(self.t, idx)
+            j = jurisdiction_hint(msg)
+            if j == jur:
+                return msg
+            self.pending[j].append(msg)
+        self.done = True
+        return None
+
+    def empty(self):
+        return self.done and not any(self.pending.values())
+
+def iter_synth(seed=42, templates=None, warn=True):
+    """web_search 샘플 무한 스트림. 한 바퀴(고유 조합 전체) 안에서는 중복 없음.
+    매번 (관할 → 템플릿) 순으로 지금까지 가장 적게 나온 쪽에서 하나씩 꺼냄."""
+    templates = list(templates or TEMPLATES)
+    unique = sum(combo_count(t) for t in templates)
+    for cycle in itertools.count():
+        if cycle == 1 and warn:
+            print(f"[WARN] 고유 web_search 조합 {unique}개 소진 → 순열 {cycle + 1}회차 (문장 중복 발생)", file=sys.stderr)
+        rng = random.Random(f"{seed}:{cycle}")
+        streams = [_TemplateStream(t, rng) for t in templates]
+        by_jur, by_tpl = Counter(), Counter()
+        dead = set()   # 더 이상 나올 수 없는 (템플릿, 관할)
+        while True:
+            got = None
+            for jur in sorted(JUR_ORDER, key=lambda j: (by_jur[j], JUR_ORDER.index(j))):
+                for i in sorted(range(len(streams)), key=lambda i: (by_tpl[i], i)):
+                    if (i, jur) in dead:
+                        continue
+                    msg = streams[i].take(jur)
+                    if msg is None:
+                        dead.add((i, jur))
+                        continue
+                    got = (i, jur, msg)
+                    break
+                if got:
+                    break
+            if got is None:
+                break
+            i, jur, msg = got
+            by_jur[jur] += 1
+            by_tpl[i] += 1
+            yield make_sample(msg)
+
 def synth(n=200, seed=42):
-    random.seed(seed)
-    out = []
-    for _ in range(n):
-        t = random.choice(TEMPLATES)
-        msg = t.format(
-            topic=random.choice(TOPICS),
-            kind=random.choice(KINDS),
-            org=random.choice(ORGS),
-            product=random.choice(PRODUCTS),
-            country=random.choice(COUNTRIES),
-            law=random.choice(LAWS),
-        )
-        # jurisdiction 힌트 간단 추정
-        jur = "WIPO" if "WIPO" in msg else ("US" if "USPTO" in msg or "미국" in msg else ("KR" if "한국" in msg or "KIPO" in msg else "unknown"))
-        resp = json.dumps({"intent":"patent_info","action":"web_search","jurisdiction":jur,"confidence":0.65}, ensure_ascii=False)
-        out.append({
-            "messages":[
-                {"role":"system","content":SYS_PROMPT},
-                {"role":"user","content":msg}
-            ],
-            "response": resp
-        })
-    return out
+    return list(itertools.islice(iter_synth(seed), n))
 
 def count_web_search(path):
-    ws = 0; total = 0
-    with open(path, encoding="utf-8") as f:
-        for line in f:
-            s = line.strip()
-            if not s: continue
-            total += 1
-            try:
-                obj = json.loads(s)
-                r = json.loads(obj["response"])
-                if r.get("action") == "web_search":
-                    ws += 1
-            except Exception:
-                pass
-    return ws, total
-
-def mix_to_ratio(src, synth_items, target_ratio=0.15):
-    # src 전부 + synth 일부를 합쳐서 최종 web_search 비율을 target_ratio로 맞춤
-    src_items = []
-    ws_src = 0
-    with open(src, encoding="utf-8") as f:
-        for line in f:
-            s = line.strip()
-            if not s: continue
-            obj = json.loads(s)
-            try:
-                r = json.loads(obj["response"])
-            except Exception:
-                continue
-            if r.get("action") == "web_search": ws_src += 1
-            src_items.append(obj)
-    total_src = len(src_items)
-    ws_needed = int((target_ratio * total_src - ws_src) / (1 - target_ratio)) if target_ratio < 1 else 0
-    ws_needed = max(0, ws_needed)
-    synth_slice = synth_items[:ws_needed]
+    # 줄 오프셋/라벨 인덱스(jsonl_index)로 집계 → 두 번째부터는 파일을 다시 파싱하지 않음
+    with JsonlIndex(path) as idx:
+        return idx.counts("action").get("web_search", 0), len(idx)
+
+def synth_needed(n, ws, target_ratio):
+    """(ws + s) / (n + s) ≤ r 을 만족하는 최대 s = floor((r·n − ws) / (1 − r)), 음수면 0."""
+    if not 0 <= target_ratio < 1:
+        raise ValueError("target_ratio must be in [0, 1)")
+    return max(0, math.floor((target_ratio * n - ws) / (1 - target_ratio) + 1e-9))
+
+def mix_to_ratio(src, synth_items=None, target_ratio=0.15, seed=42):
+    # src 전부 + synth 일부를 합쳐서 최종 web_search 비율을 target_ratio로 맞춤 (메모리에서 셔플)
+    # synth_items 가 없거나 모자라면 iter_synth 에서 필요한 만큼 더 뽑음
+    with JsonlIndex(src) as idx:
+        codes = idx.label_codes("action")
+        keep = [i for i, c in enumerate(codes) if c != NO_LABEL]   # 응답이 잘못된 줄은 제외
+        ws_src = sum(1 for i in keep if codes[i] == WS_CODE)
+        src_items = [idx.get(i) for i in keep]
+    ws_needed = synth_needed(len(src_items), ws_src, target_ratio)
+    synth_iter = itertools.chain(synth_items or [], iter_synth(seed))
+    synth_slice = list(itertools.islice(synth_iter, ws_needed))
     mixed = src_items + synth_slice
-    random.shuffle(mixed)
+    random.Random(seed).shuffle(mixed)
     return mixed, synth_slice
 
+def mix_stream(src, out_mix, out_syn=None, target_ratio=0.15, seed=42):
+    """src 순서 그대로 out_mix 에 기록, 합성 s 개를 고르게 끼워 넣음 (j 번째 src 줄 뒤까지 floor(j·s/N) 개).
+    N, ws, s 는 인덱스의 라벨 코드로 쓰기 전에 계산 → web_search 줄이 파일 끝에 몰려 있어도 s 는 정확.
+    응답이 잘못된 src 줄은 mix_shuffled 와 같이 제외."""
+    gen = iter_synth(seed)
+    fs = open(out_syn, "w", encoding="utf-8") if out_syn else None
+    try:
+        with JsonlIndex(src) as idx, open(out_mix, "wb") as fo:
+            codes = idx.label_codes("action")
+            n = sum(1 for c in codes if c != NO_LABEL)
+            ws = codes.count(WS_CODE)
+            s = synth_needed(n, ws, target_ratio)
+            j = done = 0
+            for i, c in enumerate(codes):
+                if c == NO_LABEL:
+                    continue
+                with idx.view(i) as v:
+                    fo.write(v)
+                fo.write(b"\n")
+                j += 1
+                while done < j * s // n:
+                    row = json.dumps(next(gen), ensure_ascii=False)
+                    fo.write(row.encode("utf-8") + b"\n")
+                    if fs: fs.write(row + "\n")
+                    done += 1
+    finally:
+        if fs: fs.close()
+    return {"src": n, "src_web_search": ws, "synth": s, "total": n + s,
+            "ratio": round((ws + s) / (n + s), 6) if n + s else 0.0}
+
+def mix_shuffled(src, out_mix, out_syn=None, target_ratio=0.15, seed=42):
+    """mix_to_ratio 와 같은 결과 구성(잘못된 줄 제외, floor 개수)을 셔플해 기록.
+    메모리에는 줄 번호 순열(8바이트/줄)만 두고, src 줄은 mmap 에서 필요한 순서대로 읽음."""
+    with JsonlIndex(src) as idx:
+        codes = idx.label_codes("action")
+        keep = array.array("Q", (i for i, c in enumerate(codes) if c != NO_LABEL))
+        ws_src = codes.count(WS_CODE)
+        n = len(keep)
+        s = synth_needed(n, ws_src, target_ratio)
+        order = array.array("Q", range(n + s))   # < n: src, ≥ n: 합성
+        random.Random(seed).shuffle(order)
+        gen = iter_synth(seed)
+        fs = open(out_syn, "w", encoding="utf-8") if out_syn else None
+        try:
+            with open(out_mix, "wb") as fo:
+                for k in order:
+                    if k < n:
+                        with idx.view(keep[k]) as v:
+                            fo.write(v)
+                        fo.write(b"\n")
+                    else:
+                        row = json.dumps(next(gen), ensure_ascii=False)
+                        fo.write(row.encode("utf-8") + b"\n")
+                        if fs: fs.write(row + "\n")
+        finally:
+            if fs: fs.close()
+    return {"src": n, "src_web_search": ws_src, "synth": s, "total": n + s,
+            "ratio": round((ws_src + s) / (n + s), 6) if n + s else 0.0}
+
 if __name__ == "__main__":
-    os.makedirs(os.path.dirname(OUT_MIX), exist_ok=True)
-    # 1) 합성 생성
-    syn = synth(n=200)
-    with open(OUT_SYN, "w", encoding="utf-8") as fo:
-        for s in syn: fo.write(json.dumps(s, ensure_ascii=False) + "\n")
-    # 2) 비율 계산 + 믹싱(목표 15%)
-    mixed, used = mix_to_ratio(SRC, syn, target_ratio=0.15)
-    with open(OUT_MIX, "w", encoding="utf-8") as fo:
-        for s in mixed: fo.write(json.dumps(s, ensure_ascii=False) + "\n")
-    print(f"[OK] web_search_synth={len(syn)}, used_for_mix={len(used)}, out={OUT_MIX}")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--src", default=SRC)
+    parser.add_argument("--out", default=OUT_MIX)
+    parser.add_argument("--synth-out", default=OUT_SYN, help="믹싱에 실제로 들어간 합성 샘플 기록")
+    parser.add_argument("--ratio", type=float, default=0.15, help="최종 web_search 비율")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stream", action="store_true",
+                        help="셔플 없이 src 순서대로 기록, 합성 샘플은 고르게 끼워 넣음 (기본: 셔플)")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    mix = mix_stream if args.stream else mix_shuffled
+    st = mix(args.src, args.out, args.synth_out, target_ratio=args.ratio, seed=args.seed)
+    print(f"[OK] src={st['src']} (web_search {st['src_web_search']}), synth={st['synth']}, "
+          f"total={st['total']}, ratio={st['ratio']}, out={args.out}")
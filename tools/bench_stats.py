@@ -0,0 +1,37 @@
+# C:\dana\demo_dana\tools\bench_stats.py
+# 벤치마크 공용 지표/회귀 비교 (qdrant/bench_ipraw.py, tools/eval_router.py 가 함께 사용, 표준 라이브러리만)
+# - percentile: nearest-rank (ceil(p/100 · n) 번째 값)
+# - latency_summary: 지연 목록 → {"p50","p95","p99","mean","max"}
+# - drop_problem / increase_problem: 이전 리포트 대비 회귀면 메시지, 아니면 None
+import math
+
+def percentile(sorted_vals, p):
+    """nearest-rank 백분위수: ceil(p/100 · n) 번째 값 (sorted_vals 는 오름차순)."""
+    if not sorted_vals:
+        return 0.0
+    n = len(sorted_vals)
+    # p/100*n 은 부동소수 오차로 정수를 살짝 넘을 수 있음 (0.07*100 → 7.000000000000001)
+    idx = max(0, min(n - 1, math.ceil(p * n / 100.0) - 1))
+    return sorted_vals[idx]
+
+def latency_summary(latencies_ms, ndigits=2):
+    lat = sorted(latencies_ms)
+    return {
+        "p50": round(percentile(lat, 50), ndigits),
+        "p95": round(percentile(lat, 95), ndigits),
+        "p99": round(percentile(lat, 99), ndigits),
+        "mean": round(sum(lat) / len(lat), ndigits) if lat else 0.0,
+        "max": round(lat[-1], ndigits) if lat else 0.0,
+    }
+
+def drop_problem(label, base, cur, max_drop):
+    """높을수록 좋은 지표(정확도/recall 등): base - cur > max_drop 이면 회귀."""
+    if base - cur > max_drop:
+        return f"{label}: {base} → {cur}"
+    return None
+
+def increase_problem(label, base, cur, max_increase):
+    """낮을수록 좋은 지표(지연): 증가율 (cur - base) / base > max_increase 이면 회귀."""
+    if base > 0 and (cur - base) / base > max_increase:
+        return f"{label}: {base}ms → {cur}ms"
+    return None
@@ -0,0 +1,300 @@
+# C:\dana\demo_dana\tools\eval_router.py
+# 라우터 평가: val.jsonl 을 스트리밍으로 읽어 백엔드에 동시 요청 → 정확도/JSON 유효율/지연/처리량 리포트
+# - 백엔드
+#   http : llama.cpp server 등 OpenAI 호환 /v1/chat/completions (서버측 --parallel 로 연속 배칭)
+#   stub : 네트워크 없이 결정적 규칙으로 응답 (오프라인 점검/하니스 자체 성능 측정용)
+#   prerouter : 규칙 fast-path(prerouter.py) + 미적중 시 --fallback 백엔드 → 적중률/절약 지연도 리포트
+# - 응답은 routing_schema.parse_response 로 검증 (JSON 한 개만 허용)
+# - 정답 응답 자체가 스키마 위반인 줄은 평가에서 제외하고 개수만 보고
+#
+# 예) python tools\eval_router.py --backend http --url http://localhost:8080 --concurrency 8
+#     python tools\eval_router.py --backend stub --limit 1000 --out data\sft\eval_stub.json
+#     python tools\eval_router.py --baseline eval_prev.json --max-acc-drop 0.01   # 회귀 시 exit 1
+import os, sys, json, time, argparse
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from routing_schema import parse_response, user_prompt, ENUMS
+from bench_stats import latency_summary, drop_problem, increase_problem
+
+PROJECT_ROOT = r"C:\dana\demo_dana"
+VAL_PATH     = os.path.join(PROJECT_ROOT, r"data\sft\val.jsonl")
+ROUTER_URL   = os.getenv("ROUTER_URL", "http://localhost:8080")
+LABELS       = tuple(ENUMS)   # intent / action / jurisdiction
+
+# ---------- 백엔드 ----------
+class HttpBackend:
+    """OpenAI 호환 chat completions. 스레드별 세션(keep-alive) 사용."""
+    name = "http"
+
+    def __init__(self, url=ROUTER_URL, model=None, timeout=60, max_tokens=64):
+        import threading, requests
+        self.url = url.rstrip("/") + "/v1/chat/completions"
+        self.model = model
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self._requests = requests
+        self._local = threading.local()
+
+    def _session(self):
+        s = getattr(self._local, "session", None)
+        if s is None:
+            s = self._local.session = self._requests.Session()
+        return s
+
+    def __call__(self, messages):
+        body = {"messages": messages, "temperature": 0, "max_tokens": self.max_tokens}
+        if self.model:
+            body["model"] = self.model
+        r = self._session().post(self.url, json=body, timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()["choices"][0]["message"]["content"]
+
+class StubBackend:
+    """make_jsonl 규칙을 프롬프트만 보고 흉내내는 결정적 라우터 (문서 유형 정보는 없음 → KR 고정)."""
+    name = "stub"
+
+    def __init__(self, latency_ms=0.0):
+        from make_jsonl import PROCESS_KWS
+        self.kws = PROCESS_KWS
+        self.latency = latency_ms / 1000.0
+
+    def __call__(self, messages):
+        if self.latency:
+            time.sleep(self.latency)
+        u = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "") or ""
+        if "요약" in u:
+            intent, action, conf = "patent_info", "summarize", 0.68
+        elif any(k in u for k in self.kws):
+            intent, action, conf = "process", "retrieve", 0.76
+        else:
+            intent, action, conf = "patent_info", "retrieve", 0.72
+        return json.dumps({"intent": intent, "action": action, "jurisdiction": "KR", "confidence": conf},
+                          ensure_ascii=False)
+
+class PreRouterBackend:
+    """prerouter 규칙 fast-path → threshold 미만이면 fallback 백엔드 호출. 통계는 self.pr.stats()."""
+    name = "prerouter"
+
+    def __init__(self, prerouter, fallback):
+        self.pr = prerouter
+        self.fallback = fallback
+
+    def __call__(self, messages):
+        u = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "") or ""
+        raw = {}
+
+        def model_fn(_text):
+            raw["text"] = self.fallback(messages)
+            return parse_response(raw["text"])[0]
+
+        d, source = self.pr.route(u, model_fn)
+        # 모델 결과는 원문 그대로 돌려줘야 JSON 유효성까지 평가됨
+        return json.dumps(d, ensure_ascii=False) if source == "rule" else raw["text"]
+
+def make_backend(args, kind=None):
+    kind = kind or args.backend
+    if kind == "http":
+        return HttpBackend(args.url, model=args.model, timeout=args.timeout, max_tokens=args.max_tokens)
+    if kind == "stub":
+        return StubBackend(latency_ms=args.stub_latency_ms)
+    if kind == "prerouter":
+        from prerouter import PreRouter
+        pr = PreRouter.load(args.calib, threshold=args.threshold, shadow_rate=args.shadow_rate)
+        return PreRouterBackend(pr, make_backend(args, args.fallback))
+    raise ValueError(f"unknown backend: {kind}")
+
+# ---------- 입력 ----------
+def iter_batches(path, batch_size, limit=None, skipped=None):
+    """val.jsonl → [(줄번호, messages, 정답 dict)] 배치. 정답이 스키마 위반이면 skipped 에 집계."""
+    batch, n = [], 0
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            s = line.strip()
+            if not s:
+                continue
+            try:
+                sample = json.loads(s)
+            except ValueError:
+                sample = None
+            gold, err = parse_response(sample.get("response")) if isinstance(sample, dict) else (None, "invalid_line_json")
+            if err or not user_prompt(sample):
+                if skipped is not None:
+                    skipped[err or "empty_user"] += 1
+                continue
+            # 평가 입력 = 정답 응답을 뺀 messages (system + user)
+            msgs = [m for m in sample["messages"] if m.get("role") != "assistant"]
+            batch.append((lineno, msgs, gold))
+            n += 1
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+            if limit and n >= limit:
+                break
+    if batch:
+        yield batch
+
+def run_batch(backend, batch):
+    out = []
+    for lineno, msgs, gold in batch:
+        t0 = time.perf_counter()
+        try:
+            text, exc = backend(msgs), None
+        except Exception as e:
+            text, exc = None, type(e).__name__
+        out.append((lineno, gold, text, exc, time.perf_counter() - t0))
+    return out
+
+# ---------- 집계 ----------
+class Tally:
+    def __init__(self, n_examples=10):
+        self.n = 0
+        self.valid = 0
+        self.exact = 0
+        self.correct = Counter()
+        self.conf_abs_err = 0.0
+        self.errors = Counter()
+        self.confusion = {k: Counter() for k in LABELS}   # "gold→pred" 오답만
+        self.latencies = []
+        self.examples = []
+        self.n_examples = n_examples
+
+    def add(self, lineno, gold, text, exc, latency):
+        self.n += 1
+        self.latencies.append(latency)
+        if exc:
+            pred, err = None, "backend_" + exc
+        else:
+            pred, err = parse_response(text)
+        if err:
+            self.errors[err] += 1
+            if len(self.examples) < self.n_examples:
+                self.examples.append({"line": lineno, "error": err, "output": (text or "")[:200]})
+            return
+        self.valid += 1
+        ok_all = True
+        for k in LABELS:
+            if pred[k] == gold[k]:
+                self.correct[k] += 1
+            else:
+                ok_all = False
+                self.confusion[k][f"{gold[k]}→{pred[k]}"] += 1
+        self.exact += ok_all
+        self.conf_abs_err += abs(float(pred["confidence"]) - float(gold["confidence"]))
+
+    def report(self, wall):
+        n = self.n or 1
+        return {
+            "n": self.n,
+            "json_valid_rate": round(self.valid / n, 4),
+            # 정확도 분모 = 전체 (무효 JSON 은 오답으로 취급)
+            "accuracy": {k: round(self.correct[k] / n, 4) for k in LABELS},
+            "exact_match": round(self.exact / n, 4),
+            "confidence_mae": round(self.conf_abs_err / self.valid, 4) if self.valid else None,
+            "errors": dict(self.errors.most_common()),
+            "confusion": {k: dict(c.most_common(10)) for k, c in self.confusion.items()},
+            "latency_ms": latency_summary([x * 1000 for x in self.latencies]),
+            "samples_per_s": round(self.n / wall, 2) if wall > 0 else None,
+            "seconds": round(wall, 3),
+            "examples": self.examples,
+        }
+
+def evaluate(backend, path, batch_size=8, concurrency=4, limit=None, progress_every=1000):
+    """배치를 스트리밍으로 제출, 동시에 진행 중인 배치는 concurrency*2 개로 제한 (메모리 일정)."""
+    tally, skipped = Tally(), Counter()
+    batches = iter_batches(path, batch_size, limit=limit, skipped=skipped)
+    t0 = time.perf_counter()
+    next_log = progress_every
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(run_batch, backend, batch))
+            if len(pending) >= concurrency * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    pending.remove(fut)
+                    for r in fut.result():
+                        tally.add(*r)
+            if progress_every and tally.n >= next_log:
+                print(f"[eval] {tally.n} samples, {tally.n / (time.perf_counter() - t0):.1f}/s", file=sys.stderr)
+                next_log += progress_every
+        for fut in pending:
+            for r in fut.result():
+                tally.add(*r)
+    rep = tally.report(time.perf_counter() - t0)
+    rep["skipped_gold"] = dict(skipped)
+    return rep
+
+def compare_baseline(rep, baseline_path, max_acc_drop, max_p95_increase):
+    with open(baseline_path, encoding="utf-8") as f:
+        base = json.load(f)["result"]
+    problems = [drop_problem(f"accuracy[{k}]", base["accuracy"][k], rep["accuracy"][k], max_acc_drop)
+                for k in LABELS]
+    problems.append(drop_problem("json_valid_rate", base["json_valid_rate"], rep["json_valid_rate"], max_acc_drop))
+    problems.append(increase_problem("latency p95", base["latency_ms"]["p95"], rep["latency_ms"]["p95"],
+                                     max_p95_increase))
+    return [p for p in problems if p]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--val", default=VAL_PATH, help="평가 JSONL (기본: data\\sft\\val.jsonl)")
+    parser.add_argument("--backend", choices=["http", "stub", "prerouter"], default="http")
+    parser.add_argument("--fallback", choices=["http", "stub"], default="http", help="prerouter 미적중 시 백엔드")
+    parser.add_argument("--calib", default=None, help="prerouter 보정 파일 (기본: data\\sft\\prerouter_calib.json)")
+    parser.add_argument("--threshold", type=float, default=0.9, help="prerouter fast-path 기준 confidence")
+    parser.add_argument("--shadow-rate", type=float, default=0.0, help="적중 중 모델도 호출해 일치율을 잴 비율")
+    parser.add_argument("--url", default=ROUTER_URL, help="http 백엔드 주소 (env ROUTER_URL)")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="stub 백엔드 인위 지연")
+    parser.add_argument("--batch-size", type=int, default=8, help="작업 단위 (스레드 1개가 연속 처리)")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시 요청 수")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--tag", default=None, help="리포트에 남길 라벨 (모델/릴리스명)")
+    parser.add_argument("--out", default=None, help="리포트 JSON 경로 (미지정 시 stdout)")
+    parser.add_argument("--baseline", default=None, help="이전 리포트와 비교, 회귀 시 exit 1")
+    parser.add_argument("--max-acc-drop", type=float, default=0.01)
+    parser.add_argument("--max-p95-increase", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.val):
+        print(f"[FATAL] val file not found: {args.val}", file=sys.stderr); sys.exit(1)
+
+    if args.backend == "prerouter" and args.calib is None:
+        from prerouter import CALIB_PATH
+        args.calib = CALIB_PATH
+    backend = make_backend(args)
+    rep = evaluate(backend, args.val, batch_size=args.batch_size, concurrency=args.concurrency, limit=args.limit)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "tag": args.tag,
+            "backend": backend.name,
+            "url": args.url if "http" in (args.backend, args.fallback if args.backend == "prerouter" else None) else None,
+            "val": args.val,
+            "batch_size": args.batch_size,
+            "concurrency": args.concurrency,
+        },
+        "result": rep,
+    }
+    if backend.name == "prerouter":
+        report["meta"]["fallback"] = args.fallback
+        report["prerouter"] = backend.pr.stats()
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fo:
+            fo.write(text + "\n")
+        print(f"[OK] wrote {args.out}", file=sys.stderr)
+    else:
+        print(text)
+    acc = " ".join(f"{k}={rep['accuracy'][k]}" for k in LABELS)
+    print(f"[eval] n={rep['n']} valid={rep['json_valid_rate']} {acc} exact={rep['exact_match']} "
+          f"p95={rep['latency_ms']['p95']}ms {rep['samples_per_s']}/s", file=sys.stderr)
+
+    if args.baseline:
+        problems = compare_baseline(rep, args.baseline, args.max_acc_drop, args.max_p95_increase)
+        for p in problems:
+            print(f"[regression] {p}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
@@ -0,0 +1,212 @@
+# C:\dana\demo_dana\tools\jsonl_index.py
+# SFT JSONL 공용 리더: 줄 오프셋 인덱스를 한 번 만들어 저장 → 이후 인덱스로 임의 접근
+# - 인덱스: <파일 폴더>\.cache\<파일명>.idx (파일 크기/mtime 이 바뀌면 자동 재생성)
+#   · 빈 줄을 제외한 각 줄의 [start, end) 바이트 오프셋
+#   · 줄별 응답 라벨 코드(intent/action/jurisdiction) → 라벨 집계/층화 샘플링 때 JSON 파싱 없음
+# - mmap 으로 열어 line_bytes(i) 는 해당 줄 bytes 복사본, get(i) 는 해당 줄만 파싱
+#   · view(i) 는 복사 없는 memoryview — close() 전에 release 해야 함 (들고 있으면 close() 가 BufferError)
+#     with idx.view(i) as v: fo.write(v)   ← 대용량 재기록(add_web_search 등)용
+# - 에폭별 셔플 순회, 라벨 기준 층화 샘플링 → 비용이 파일 크기가 아니라 읽는 줄 수에 비례
+#
+# 예) idx = JsonlIndex(r"C:\dana\demo_dana\data\sft\train.jsonl")
+#     len(idx), idx.counts("action"), idx.get(123)
+#     for sample in idx.iter_epoch(seed=42, epoch=0): ...
+#     picks = idx.stratified_sample(1000, field="action", seed=0)
+#     python tools\jsonl_index.py data\sft\train.jsonl --stats
+import os, re, sys, json, mmap, array, random, struct, argparse
+from collections import Counter
+
+from routing_schema import parse_response, ENUMS
+
+MAGIC = b"JLIDX001"
+HEADER = struct.Struct("<8sQqQ")          # magic, file size, mtime_ns, 줄 수
+LABEL_FIELDS = tuple(ENUMS)              # intent / action / jurisdiction
+NO_LABEL = 255                           # 응답이 스키마 위반/누락
+_CODES = {f: {v: i for i, v in enumerate(ENUMS[f])} for f in LABEL_FIELDS}
+
+# 줄 전체(messages 포함)를 파싱하지 않고 "response" 문자열 리터럴만 잘라냄
+_RESPONSE = re.compile(rb'"response"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+def default_index_path(path):
+    d, name = os.path.split(os.path.abspath(path))
+    return os.path.join(d, ".cache", name + ".idx")
+
+def _line_labels(raw):
+    """JSONL 한 줄(bytes) → 라벨 코드 튜플."""
+    resp = None
+    m = _RESPONSE.search(raw)
+    try:
+        if m:
+            resp = json.loads(b'"' + m.group(1) + b'"')
+        else:
+            resp = json.loads(raw).get("response")
+    except Exception:
+        resp = None
+    obj, err = parse_response(resp)
+    if err:
+        return (NO_LABEL,) * len(LABEL_FIELDS)
+    return tuple(_CODES[f][obj[f]] for f in LABEL_FIELDS)
+
+def build_index(path, index_path):
+    st = os.stat(path)
+    starts, ends = array.array("Q"), array.array("Q")
+    labels = bytearray()
+    with open(path, "rb") as f:
+        pos = 0
+        for raw in f:
+            start, pos = pos, pos + len(raw)
+            body = raw.rstrip(b"\r\n")
+            if not body.strip():
+                continue
+            starts.append(start)
+            ends.append(start + len(body))
+            labels.extend(_line_labels(body))
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    tmp = index_path + ".tmp"
+    with open(tmp, "wb") as fo:
+        fo.write(HEADER.pack(MAGIC, st.st_size, st.st_mtime_ns, len(starts)))
+        starts.tofile(fo)
+        ends.tofile(fo)
+        fo.write(labels)
+    os.replace(tmp, index_path)
+    return st.st_size, st.st_mtime_ns, starts, ends, bytes(labels)
+
+def load_index(path, index_path):
+    """저장된 인덱스가 현재 파일과 맞으면 반환, 아니면 None."""
+    try:
+        with open(index_path, "rb") as f:
+            magic, size, mtime_ns, n = HEADER.unpack(f.read(HEADER.size))
+            st = os.stat(path)
+            if magic != MAGIC or size != st.st_size or mtime_ns != st.st_mtime_ns:
+                return None
+            starts, ends = array.array("Q"), array.array("Q")
+            starts.fromfile(f, n)
+            ends.fromfile(f, n)
+            labels = f.read(n * len(LABEL_FIELDS))
+            if len(labels) != n * len(LABEL_FIELDS):
+                return None
+    except (OSError, EOFError, struct.error):
+        return None
+    return size, mtime_ns, starts, ends, labels
+
+class JsonlIndex:
+    def __init__(self, path, index_path=None, rebuild=False):
+        self.path = path
+        self.index_path = index_path or default_index_path(path)
+        loaded = None if rebuild else load_index(path, self.index_path)
+        self.built = loaded is None
+        if loaded is None:
+            loaded = build_index(path, self.index_path)
+        _, _, self.starts, self.ends, self._labels = loaded
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else None
+
+    # ---------- 기본 접근 ----------
+    def __len__(self):
+        return len(self.starts)
+
+    def line_bytes(self, i):
+        """i 번째 줄 (개행 제외) bytes — close() 이후에도 유효."""
+        return self._mm[self.starts[i]:self.ends[i]]
+
+    def view(self, i):
+        """i 번째 줄 (개행 제외) 의 mmap memoryview, 복사 없음.
+        close() 이후에는 무효이고, release 전에는 close() 가 BufferError → with 문으로 바로 해제."""
+        return memoryview(self._mm)[self.starts[i]:self.ends[i]]
+
+    def line(self, i):
+        return self._mm[self.starts[i]:self.ends[i]].decode("utf-8")
+
+    def get(self, i):
+        return json.loads(self._mm[self.starts[i]:self.ends[i]])
+
+    def __getitem__(self, i):
+        return self.get(i)
+
+    def lines(self, indices):
+        for i in indices:
+            yield self.line(i)
+
+    # ---------- 라벨 ----------
+    def label(self, i, field="action"):
+        code = self._labels[i * len(LABEL_FIELDS) + LABEL_FIELDS.index(field)]
+        return None if code == NO_LABEL else ENUMS[field][code]
+
+    def label_codes(self, field="action"):
+        """줄 순서대로의 라벨 코드 (bytes, NO_LABEL=255)."""
+        k = len(LABEL_FIELDS)
+        return self._labels[LABEL_FIELDS.index(field)::k]
+
+    def counts(self, field="action"):
+        """{라벨: 줄 수}, 응답이 잘못된 줄은 None."""
+        c = Counter(self.label_codes(field))
+        return {(None if code == NO_LABEL else ENUMS[field][code]): n for code, n in c.most_common()}
+
+    def indices_by_label(self, field="action"):
+        groups = {}
+        for i, code in enumerate(self.label_codes(field)):
+            groups.setdefault(None if code == NO_LABEL else ENUMS[field][code], []).append(i)
+        return groups
+
+    # ---------- 순회 / 샘플링 ----------
+    def epoch_order(self, seed=0, epoch=0):
+        order = list(range(len(self)))
+        random.Random(f"{seed}:{epoch}").shuffle(order)
+        return order
+
+    def iter_epoch(self, seed=0, epoch=0, parse=True):
+        """에폭마다 다른(하지만 재현 가능한) 순서로 전체 순회."""
+        get = self.get if parse else self.line
+        for i in self.epoch_order(seed, epoch):
+            yield get(i)
+
+    def stratified_sample(self, n=None, field="action", seed=0, quotas=None, include_invalid=False):
+        """라벨 비율을 유지한 n 개 (또는 quotas={라벨: 개수}) 줄 인덱스를 파일 순서로 반환."""
+        groups = self.indices_by_label(field)
+        if not include_invalid:
+            groups.pop(None, None)
+        total = sum(len(g) for g in groups.values())
+        if quotas is None:
+            if n is None or n >= total:
+                return sorted(i for g in groups.values() for i in g)
+            # 최대 잉여(largest remainder) 배분 → 합이 정확히 n
+            exact = {k: n * len(g) / total for k, g in groups.items()}
+            quotas = {k: int(v) for k, v in exact.items()}
+            rest = n - sum(quotas.values())
+            for k in sorted(exact, key=lambda k: (quotas[k] - exact[k], str(k)))[:rest]:
+                quotas[k] += 1
+        rng = random.Random(seed)
+        picked = []
+        for k, q in quotas.items():
+            g = groups.get(k, [])
+            picked.extend(g if q >= len(g) else rng.sample(g, q))
+        return sorted(picked)
+
+    # ---------- 정리 ----------
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="+", help="인덱싱할 JSONL")
+    parser.add_argument("--rebuild", action="store_true", help="저장된 인덱스 무시하고 재생성")
+    parser.add_argument("--stats", action="store_true", help="라벨별 줄 수 출력")
+    args = parser.parse_args()
+
+    for p in args.files:
+        if not os.path.exists(p):
+            print(f"[FATAL] file not found: {p}", file=sys.stderr); sys.exit(1)
+        with JsonlIndex(p, rebuild=args.rebuild) as idx:
+            print(f"[{'BUILD' if idx.built else 'OK'}] {p}: lines={len(idx)} index={idx.index_path}")
+            if args.stats:
+                for f in LABEL_FIELDS:
+                    print(f"  {f}: {json.dumps(idx.counts(f), ensure_ascii=False)}")
@@ -1,4 +1,4 @@
-import os, json, glob, sys, argparse, math
+import os, json, glob, sys, argparse, math, hashlib, inspect
 
 # ---------- 경로 ----------
 PROJECT_ROOT = r"C:\dana\demo_dana"
@@ -6,6 +6,7 @@ DATA_ROOT    = os.path.join(PROJECT_ROOT, r"unzip_data\ip\dataset")
 OUT_TRAIN    = os.path.join(PROJECT_ROOT, r"data\sft\train.jsonl")
 OUT_VAL      = os.path.join(PROJECT_ROOT, r"data\sft\val.jsonl")
 OUT_LEFTOVER = os.path.join(PROJECT_ROOT, r"data\sft\summary_leftover.jsonl")
+CACHE_PATH   = os.path.join(PROJECT_ROOT, r"data\sft\.cache\make_jsonl.cache.jsonl")
 
 # ---------- 상수 ----------
 SYS_PROMPT = (
@@ -40,6 +41,91 @@ def safe_load_json(fp):
     except Exception:
         return None
 
+def extract_fields(rec):
+    """원본 레코드에서 변환에 필요한 필드만 추출 (캐시 저장 단위)."""
+    info  = (rec.get("info") or {})
+    tinfo = (rec.get("taskinfo") or {})
+    return {
+        "ttype": str(info.get("taskType","")),
+        "dtype": str(info.get("document_type","")),
+        "input": (tinfo.get("input") or ""),
+        "title": info.get("title","해당 문서"),
+    }
+
+# ---------- 증분 캐시 ----------
+# 파일별로 (mtime, size) → 추출 필드, (rules 버전, mode) → 변환된 JSONL 한 줄을 저장.
+# - 새/변경 파일만 다시 읽고 파싱
+# - 라우팅 규칙(SYS_PROMPT, PROCESS_KWS, to_sample)이 바뀌면 파일은 다시 읽지 않고 캐시된 필드로 재변환
+# - extract_fields 가 바뀌면(FIELDS_VERSION) 캐시된 필드를 버리고 원본을 다시 파싱
+# - 정리: 원본 파일이 사라진 항목만 삭제 (--limit 실행에서 안 읽은 파일은 유지)
+class ConvertCache:
+    def __init__(self, path, enabled=True):
+        self.path = path
+        self.enabled = enabled
+        self.entries = {}
+        self.seen = set()
+        self.dirty = False
+        self.n_parsed = 0
+        self.n_reconverted = 0
+        if enabled and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                        self.entries[e["p"]] = e
+                    except Exception:
+                        continue
+
+    def fields(self, fp):
+        st = os.stat(fp)
+        self.seen.add(fp)
+        e = self.entries.get(fp)
+        if e and e["m"] == st.st_mtime_ns and e["s"] == st.st_size and e.get("x") == FIELDS_VERSION:
+            return e
+        rec = safe_load_json(fp)
+        e = {"p": fp, "m": st.st_mtime_ns, "s": st.st_size, "x": FIELDS_VERSION,
+             "f": extract_fields(rec) if rec else None}
+        self.entries[fp] = e
+        self.n_parsed += 1
+        self.dirty = True
+        return e
+
+    def line(self, fp, mode, convert):
+        """fp → 변환된 JSONL 한 줄(문자열, 개행 제외). 레코드가 비었으면 None."""
+        e = self.fields(fp)
+        if e["f"] is None:
+            return None
+        if e.get("r") == RULES_VERSION and e.get("mode") == mode:
+            return e["o"]
+        e["o"] = json.dumps(convert(e["f"]), ensure_ascii=False)
+        e["r"], e["mode"] = RULES_VERSION, mode
+        self.n_reconverted += 1
+        self.dirty = True
+        return e["o"]
+
+    def save(self):
+        if not self.enabled:
+            return
+        # 이번 실행에서 안 읽은 파일(--limit 등)도 원본이 있으면 유지
+        stale = [p for p in self.entries if p not in self.seen and not os.path.exists(p)]
+        if not self.dirty and not stale:
+            return
+        for p in stale:
+            del self.entries[p]
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fo:
+            for e in self.entries.values():
+                fo.write(json.dumps(e, ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+
+def qa_sample(f):
+    return to_sample(f["input"], f["dtype"], f["ttype"])
+
+def summary_sample(f):
+    user_q = f"{f['title']} 관련 심결의 핵심을 한국어로 간단히 요약해줘."
+    return to_sample(user_q, f["dtype"], f["ttype"] or "02(TS)")
+
 def to_sample(user_text, doc_type, task_type):
     jur = "KR" if doc_type and any(k in doc_type for k in ["특허","심판","특허심판원","특허법원"]) else "unknown"
     u = (user_text or "").strip()
@@ -64,6 +150,22 @@ def to_sample(user_text, doc_type, task_type):
         "response": resp
     }
 
+def _source_hash(*parts, fns=()):
+    try:
+        src = "".join(inspect.getsource(fn) for fn in fns)
+    except (OSError, TypeError):
+        src = ""
+    h = hashlib.sha1()
+    for part in (*parts, src):
+        h.update(part.encode("utf-8"))
+    return h.hexdigest()[:16]
+
+# 필드 추출이 바뀌면 캐시된 필드 무효화 (원본 다시 파싱)
+FIELDS_VERSION = _source_hash(fns=(extract_fields,))
+# 라우팅 규칙(또는 그 입력인 필드 추출)이 바뀌면 캐시된 변환 결과를 무효화
+RULES_VERSION = _source_hash(SYS_PROMPT, json.dumps(PROCESS_KWS, ensure_ascii=False),
+                             fns=(extract_fields, to_sample, qa_sample, summary_sample))
+
 def collect_paths(root, split):
     cats = ["judgment","statute","trial_decision","decision","interpretation"]
     qa_paths, sum_paths = [], []
@@ -73,25 +175,19 @@ def collect_paths(root, split):
     qa_paths.sort(); sum_paths.sort()
     return qa_paths, sum_paths
 
-def write_samples(paths, fo, limit=None, tag=""):
+def write_samples(paths, fo, cache, limit=None, tag=""):
     n = 0
     for i, fp in enumerate(paths, 1):
         if limit and n >= limit: break
-        rec = safe_load_json(fp)
-        if not rec: continue
-        info  = (rec.get("info") or {})
-        tinfo = (rec.get("taskinfo") or {})
-        ttype = str(info.get("taskType",""))
-        dtype = str(info.get("document_type",""))
-        user_q = (tinfo.get("input") or "")
-        s = to_sample(user_q, dtype, ttype)
-        fo.write(json.dumps(s, ensure_ascii=False) + "\n")
+        line = cache.line(fp, "qa", qa_sample)
+        if not line: continue
+        fo.write(line + "\n")
         n += 1
         if i % 1000 == 0:
             print(f"[{tag}] processed {i}/{len(paths)}")
     return n
 
-def write_summary(paths, fo_top, fo_left, take_top_ratio=0.2, limit=None):
+def write_summary(paths, fo_top, fo_left, cache, take_top_ratio=0.2, limit=None):
     total = len(paths)
     if total == 0:
         return 0, 0
@@ -104,15 +200,9 @@ def write_summary(paths, fo_top, fo_left, take_top_ratio=0.2, limit=None):
     # top -> train
     n_top = 0
     for i, fp in enumerate(top_paths, 1):
-        rec = safe_load_json(fp)
-        if not rec: continue
-        info  = (rec.get("info") or {})
-        ttype = str(info.get("taskType",""))
-        dtype = str(info.get("document_type",""))
-        title = info.get("title","해당 문서")
-        user_q = f"{title} 관련 심결의 핵심을 한국어로 간단히 요약해줘."
-        s = to_sample(user_q, dtype, ttype or "02(TS)")
-        fo_top.write(json.dumps(s, ensure_ascii=False) + "\n")
+        line = cache.line(fp, "sum", summary_sample)
+        if not line: continue
+        fo_top.write(line + "\n")
         n_top += 1
         if i % 1000 == 0:
             print(f"[SUM:top] processed {i}/{len(top_paths)}")
@@ -120,26 +210,23 @@ def write_summary(paths, fo_top, fo_left, take_top_ratio=0.2, limit=None):
     # leftover -> 별도 파일
     n_left = 0
     for i, fp in enumerate(left_paths, 1):
-        rec = safe_load_json(fp)
-        if not rec: continue
-        info  = (rec.get("info") or {})
-        ttype = str(info.get("taskType",""))
-        dtype = str(info.get("document_type",""))
-        title = info.get("title","해당 문서")
-        user_q = f"{title} 관련 심결의 핵심을 한국어로 간단히 요약해줘."
-        s = to_sample(user_q, dtype, ttype or "02(TS)")
-        fo_left.write(json.dumps(s, ensure_ascii=False) + "\n")
+        line = cache.line(fp, "sum", summary_sample)
+        if not line: continue
+        fo_left.write(line + "\n")
         n_left += 1
         if i % 1000 == 0:
             print(f"[SUM:leftover] processed {i}/{len(left_paths)}")
 
     return n_top, n_left
 
-def main(limit=None):
+def main(limit=None, use_cache=True):
     print(f"[INFO] DATA_ROOT = {DATA_ROOT}")
     if not os.path.isdir(DATA_ROOT):
         print("[FATAL] dataset root not found"); sys.exit(1)
 
+    cache = ConvertCache(CACHE_PATH, enabled=use_cache)
+    print(f"[INFO] cache entries = {len(cache.entries)} (rules={RULES_VERSION})")
+
     os.makedirs(os.path.dirname(OUT_TRAIN), exist_ok=True)
 
     # --- TRAIN (스트리밍 2-pass: 경로만 모으고 바로 기록) ---
@@ -151,24 +238,27 @@ def main(limit=None):
 
         # QA 전부(또는 limit) 스트리밍 기록
         qa_limit = None if not limit else max(0, limit - 0)  # limit는 전체 샘플 가이드용
-        n_qa = write_samples(qa_train, f_train, limit=qa_limit, tag="QA-train")
+        n_qa = write_samples(qa_train, f_train, cache, limit=qa_limit, tag="QA-train")
 
         # SUMMARY 상단 20%만 train, 나머지 leftover
         # limit이 있으면, 남은 여력을 summary에 할당(대략적)
         sum_limit = None
         if limit:
             sum_limit = max(0, limit - n_qa)
-        n_top, n_left = write_summary(sum_train, f_train, f_left, take_top_ratio=0.2, limit=sum_limit)
+        n_top, n_left = write_summary(sum_train, f_train, f_left, cache, take_top_ratio=0.2, limit=sum_limit)
 
     # --- VAL (검증은 제한 없이 전부 포함) ---
     qa_val, sum_val = collect_paths(DATA_ROOT, "val")
     print(f"[SCAN val] qa={len(qa_val)}, summary={len(sum_val)}")
     with open(OUT_VAL, "w", encoding="utf-8") as f_val:
-        n_qv = write_samples(qa_val, f_val, limit=None, tag="QA-val")
+        n_qv = write_samples(qa_val, f_val, cache, limit=None, tag="QA-val")
         # val은 요약도 모두 포함
-        n_sv_top, _ = write_summary(sum_val, f_val, open(os.devnull, "w", encoding="utf-8"), take_top_ratio=1.0, limit=None)
+        n_sv_top, _ = write_summary(sum_val, f_val, open(os.devnull, "w", encoding="utf-8"), cache, take_top_ratio=1.0, limit=None)
+
+    cache.save()
 
     print("=== SUMMARY ===")
+    print(f"CACHE  parsed: {cache.n_parsed}, reconverted: {cache.n_reconverted}")
     print(f"TRAIN  QA_written: {n_qa}, SUM_top20_written: {n_top}, SUM_leftover_written: {n_left}")
     print(f"VAL    QA_written: {n_qv}, SUM_all_written: {n_sv_top}")
     print("[OK] wrote:")
@@ -179,5 +269,6 @@ def main(limit=None):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--limit", type=int, default=None, help="(선택) train에서 최대 샘플 수 대략 제한용")
+    parser.add_argument("--no-cache", action="store_true", help="증분 캐시를 쓰지 않고 전체 재변환")
     args = parser.parse_args()
-    main(limit=args.limit)
+    main(limit=args.limit, use_cache=not args.no_cache)
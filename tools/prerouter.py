@@ -0,0 +1,250 @@
+# C:\dana\demo_dana\tools\prerouter.py
+# 규칙 기반 선(先)라우터: 학습 라벨을 만든 규칙(make_jsonl / add_web_search)을 그대로 질의에 적용
+# - 결정 + 규칙 이름 + 보정된 confidence 반환, confidence ≥ threshold 면 모델 호출 생략 (μs 단위)
+# - threshold 미만이면 모델(3B 라우터)로 넘김 (fallthrough)
+# - 보정: 라벨된 학습 JSONL(train.jsonl)에서 규칙별 정답률을 세어 confidence 로 사용 (--calibrate)
+#   · 평가(val.jsonl)와 같은 파일로 보정하면 적중률/정확도가 부풀려지므로 반드시 다른 split 사용
+# - 관할(jurisdiction): 질의에 명시된 기관/국가만 규칙으로 판단
+#   · 학습 라벨은 문서 유형(make_jsonl.to_sample 의 document_type)으로 정해져 질의만으로는 알 수 없음
+#   · 단서가 없으면 규칙 키에 "/jur?" 를 붙여 따로 보정: 보정 데이터의 최다 관할 + 그 정답률을 사용,
+#     보정 전에는 prior 가 threshold 미만이라 모델로 넘김
+# - 통계: 적중률, 모델과의 일치율(shadow 비교), 절약된 모델 지연 추정치
+#
+# 예) python tools\prerouter.py --calibrate data\sft\train.jsonl --out data\sft\prerouter_calib.json
+#     from prerouter import PreRouter
+#     pr = PreRouter.load(r"data\sft\prerouter_calib.json", threshold=0.9)
+#     decision = pr.route(user_text, model_fn)      # model_fn(text) → 응답 dict
+#     print(pr.stats())
+import os, sys, json, time, random, argparse, threading
+from collections import Counter
+
+from routing_schema import parse_response, user_prompt, ENUMS
+from make_jsonl import PROCESS_KWS
+
+PROJECT_ROOT = r"C:\dana\demo_dana"
+CALIB_PATH   = os.path.join(PROJECT_ROOT, r"data\sft\prerouter_calib.json")
+THRESHOLD    = 0.9
+LABELS       = tuple(ENUMS)
+
+# add_web_search 템플릿에서 온 "최신 정보 필요" 단서
+WEB_SEARCH_KWS = ["최신", "최근", "이번 달", "어제", "오늘", "올해", "업데이트", "뉴스", "보도자료", "공지", "발표된", "개정된"]
+SUMMARY_KWS    = ["요약"]
+
+# 보정 파일이 없을 때의 기본 confidence (규칙 키별)
+PRIOR_CONF = {"web_search": 0.9, "summarize": 0.9, "process": 0.85, "default": 0.6}
+MIXED_PENALTY = 0.25   # 단서가 둘 이상 겹치면 (보정 전) 이만큼 낮춤
+UNRESOLVED_JUR = "/jur?"   # 관할 단서 없음 → 보정 전 confidence 상한 UNRESOLVED_CONF
+UNRESOLVED_CONF = 0.5
+MIN_SUPPORT = 20       # 보정 시 규칙 키별 최소 표본 수 (미만이면 prior 와 섞음)
+
+def jurisdiction_hint(text):
+    """add_web_search.synth 와 같은 관할 추정 (명시된 기관/국가만)."""
+    if "WIPO" in text:
+        return "WIPO"
+    if "USPTO" in text or "미국" in text:
+        return "US"
+    if "한국" in text or "KIPO" in text:
+        return "KR"
+    return "unknown"
+
+def match_rules(text):
+    """질의 → (규칙 키, 응답 dict). 규칙 키 = 적용된 규칙 + 겹친 단서 (보정 단위)."""
+    u = (text or "").strip()
+    cues = []
+    if any(k in u for k in WEB_SEARCH_KWS):
+        cues.append("web_search")
+    if any(k in u for k in SUMMARY_KWS):
+        cues.append("summarize")
+    if any(k in u for k in PROCESS_KWS):
+        cues.append("process")
+    rule = cues[0] if cues else "default"
+    jur = jurisdiction_hint(u)
+    if rule == "web_search":
+        intent, action = "patent_info", "web_search"
+    elif rule == "summarize":
+        intent, action = "patent_info", "summarize"
+    elif rule == "process":
+        intent, action = "process", "retrieve"
+    else:
+        intent, action = "patent_info", "retrieve"
+    key = "+".join(cues) if len(cues) > 1 else rule
+    if rule != "web_search" and jur == "unknown":
+        key += UNRESOLVED_JUR   # 라벨은 문서 유형 기준 → 보정된 관할을 쓰거나 모델로 넘김
+    return key, {"intent": intent, "action": action, "jurisdiction": jur}
+
+class PreRouter:
+    def __init__(self, calibration=None, threshold=THRESHOLD, shadow_rate=0.0, seed=0):
+        self.calibration = calibration or {}
+        self.threshold = threshold
+        self.shadow_rate = shadow_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = Counter()          # total / hit / fallthrough / shadow / agree
+        self.by_rule = Counter()
+        self.disagree = Counter()        # 규칙 키별 모델 불일치 수
+        self.model_ms = 0.0              # 실제 모델 호출 누적 지연
+        self.rule_ms = 0.0
+
+    @classmethod
+    def load(cls, path=CALIB_PATH, **kw):
+        calib = None
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                calib = json.load(f).get("rules")
+        return cls(calib, **kw)
+
+    def confidence(self, key):
+        c = self.calibration.get(key)
+        if c is not None:
+            return c["confidence"]
+        rules = key.replace(UNRESOLVED_JUR, "")
+        prior = PRIOR_CONF.get(rules.split("+")[0], PRIOR_CONF["default"])
+        if "+" in rules:
+            prior = max(0.0, prior - MIXED_PENALTY)
+        return min(prior, UNRESOLVED_CONF) if key.endswith(UNRESOLVED_JUR) else prior
+
+    def decide(self, text):
+        """규칙 결정만 (모델 호출 없음) → (규칙 키, 응답 dict + confidence)."""
+        key, d = match_rules(text)
+        c = self.calibration.get(key)
+        if c and c.get("jurisdiction"):
+            d["jurisdiction"] = c["jurisdiction"]   # 관할 단서 없는 키: 보정 데이터의 최다 관할
+        d["confidence"] = round(self.confidence(key), 2)
+        return key, d
+
+    def route(self, text, model_fn):
+        """규칙 confidence ≥ threshold 면 규칙 결정, 아니면 model_fn(text) 결과. 반환: (응답 dict, 출처)"""
+        t0 = time.perf_counter()
+        key, d = self.decide(text)
+        rule_ms = (time.perf_counter() - t0) * 1000
+        hit = d["confidence"] >= self.threshold
+        with self._lock:
+            self.counts["total"] += 1
+            self.by_rule[key] += 1
+            self.rule_ms += rule_ms
+            shadow = hit and self.shadow_rate > 0 and self._rng.random() < self.shadow_rate
+        if hit and not shadow:
+            with self._lock:
+                self.counts["hit"] += 1
+            return d, "rule"
+        t1 = time.perf_counter()
+        m = model_fn(text)
+        ms = (time.perf_counter() - t1) * 1000
+        with self._lock:
+            self.model_ms += ms
+            self.counts["model_calls"] += 1
+            if hit:
+                self.counts["hit"] += 1
+                self.counts["shadow"] += 1
+                if m and all(m.get(k) == d[k] for k in LABELS):
+                    self.counts["agree"] += 1
+                else:
+                    self.disagree[key] += 1
+            else:
+                self.counts["fallthrough"] += 1
+        return (d, "rule") if hit else (m, "model")
+
+    def stats(self):
+        with self._lock:
+            c = dict(self.counts)
+            total = c.get("total", 0)
+            hits = c.get("hit", 0)
+            calls = c.get("model_calls", 0)
+            avg_model = self.model_ms / calls if calls else None
+            shadow = c.get("shadow", 0)
+            return {
+                "total": total,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "fallthrough": c.get("fallthrough", 0),
+                "shadow": shadow,
+                "agreement": round(c.get("agree", 0) / shadow, 4) if shadow else None,
+                "avg_rule_us": round(self.rule_ms * 1000 / total, 2) if total else None,
+                "avg_model_ms": round(avg_model, 2) if avg_model is not None else None,
+                # 모델을 건너뛴 적중(shadow 제외) × 평균 모델 지연
+                "saved_ms_est": round((hits - shadow) * avg_model, 1) if avg_model is not None else None,
+                "by_rule": dict(self.by_rule.most_common()),
+                "disagree_by_rule": dict(self.disagree.most_common()),
+            }
+
+# ---------- 보정 ----------
+def calibrate(paths, prior_weight=MIN_SUPPORT):
+    """라벨된 JSONL → 규칙 키별 정답률(intent/action/jurisdiction 모두 일치).
+    confidence = (정답 + prior*w) / (n + w) : 표본이 적은 규칙은 prior 쪽으로 수축.
+    관할 단서가 없는 키는 intent/action 이 맞은 표본의 최다 관할을 결정값으로 저장하고 그 기준으로 채점."""
+    n, ok, jurs = Counter(), Counter(), {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                s = line.strip()
+                if not s:
+                    continue
+                try:
+                    sample = json.loads(s)
+                except ValueError:
+                    continue
+                gold, err = parse_response(sample.get("response")) if isinstance(sample, dict) else (None, "bad")
+                u = user_prompt(sample) if not err else None
+                if not u:
+                    continue
+                key, d = match_rules(u)
+                n[key] += 1
+                if d["intent"] != gold["intent"] or d["action"] != gold["action"]:
+                    continue
+                if key.endswith(UNRESOLVED_JUR):
+                    jurs.setdefault(key, Counter())[gold["jurisdiction"]] += 1
+                else:
+                    ok[key] += d["jurisdiction"] == gold["jurisdiction"]
+    base = PreRouter()
+    rules = {}
+    for key in n:
+        jur = None
+        if key in jurs:
+            jur, ok[key] = jurs[key].most_common(1)[0]
+        prior = base.confidence(key)
+        conf = (ok[key] + prior * prior_weight) / (n[key] + prior_weight)
+        rules[key] = {"n": n[key], "correct": ok[key], "precision": round(ok[key] / n[key], 4),
+                      "confidence": round(conf, 4)}
+        if jur:
+            rules[key]["jurisdiction"] = jur
+    return rules
+
+def coverage_table(rules, thresholds=(0.7, 0.8, 0.85, 0.9, 0.95)):
+    """threshold 별 예상 적중률 / 적중 시 정확도."""
+    total = sum(r["n"] for r in rules.values()) or 1
+    out = {}
+    for t in thresholds:
+        sel = [r for r in rules.values() if r["confidence"] >= t]
+        n = sum(r["n"] for r in sel)
+        out[str(t)] = {"hit_rate": round(n / total, 4),
+                       "precision": round(sum(r["correct"] for r in sel) / n, 4) if n else None}
+    return out
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calibrate", nargs="+", metavar="JSONL", help="라벨된 JSONL 로 규칙별 confidence 보정")
+    parser.add_argument("--out", default=CALIB_PATH, help="보정 결과 경로")
+    parser.add_argument("--query", default=None, help="질의 하나에 대한 규칙 결정 출력")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    if args.calibrate:
+        missing = [p for p in args.calibrate if not os.path.exists(p)]
+        if missing:
+            print("[FATAL] file not found:", missing, file=sys.stderr); sys.exit(1)
+        rules = calibrate(args.calibrate)
+        report = {"source": args.calibrate, "rules": rules, "coverage": coverage_table(rules)}
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as fo:
+            fo.write(json.dumps(report, ensure_ascii=False, indent=2) + "\n")
+        for key, r in sorted(rules.items(), key=lambda kv: -kv[1]["n"]):
+            print(f"[rule] {key:<28} n={r['n']:<7} precision={r['precision']:.3f} conf={r['confidence']:.3f}")
+        for t, c in report["coverage"].items():
+            print(f"[coverage] threshold={t} hit_rate={c['hit_rate']} precision={c['precision']}")
+        print(f"[OK] wrote {args.out}")
+    if args.query is not None:
+        pr = PreRouter.load(args.out, threshold=args.threshold)
+        key, d = pr.decide(args.query)
+        print(json.dumps({"rule": key, "decision": d, "fast_path": d["confidence"] >= args.threshold},
+                         ensure_ascii=False))
+    if not args.calibrate and args.query is None:
+        parser.print_help()
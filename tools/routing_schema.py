@@ -0,0 +1,65 @@
+# C:\dana\demo_dana\tools\routing_schema.py
+# 라우팅 응답 스키마 (README 액션 스키마와 동일) + 검증 유틸
+#   {"intent": patent_info|process|brainstorm|other,
+#    "action": retrieve|summarize|finalize|web_search,
+#    "jurisdiction": KR|US|WIPO|unknown,
+#    "confidence": 0.0–1.0}
+import json
+
+INTENTS       = ("patent_info", "process", "brainstorm", "other")
+ACTIONS       = ("retrieve", "summarize", "finalize", "web_search")
+JURISDICTIONS = ("KR", "US", "WIPO", "unknown")
+FIELDS        = ("intent", "action", "jurisdiction", "confidence")
+ENUMS = {"intent": INTENTS, "action": ACTIONS, "jurisdiction": JURISDICTIONS}
+
+def parse_response(text):
+    """라우터 출력 문자열 → (dict, None) 또는 (None, 오류코드).
+    JSON 객체 하나만 허용 (앞뒤 공백 외의 텍스트가 있으면 not_json_only)."""
+    if not isinstance(text, str):
+        return None, "response_not_str"
+    s = text.strip()
+    if not (s.startswith("{") and s.endswith("}")):
+        return None, "not_json_only"
+    try:
+        obj = json.loads(s)
+    except ValueError:
+        return None, "invalid_json"
+    if not isinstance(obj, dict):
+        return None, "not_object"
+    missing = [k for k in FIELDS if k not in obj]
+    if missing:
+        return None, "missing_" + missing[0]
+    extra = [k for k in obj if k not in FIELDS]
+    if extra:
+        return None, "extra_field"
+    for k, allowed in ENUMS.items():
+        if obj[k] not in allowed:
+            return None, "bad_" + k
+    c = obj["confidence"]
+    if isinstance(c, bool) or not isinstance(c, (int, float)):
+        return None, "confidence_not_number"
+    if not 0.0 <= c <= 1.0:
+        return None, "confidence_out_of_range"
+    return obj, None
+
+def user_prompt(sample):
+    """messages 에서 마지막 user 발화 (없으면 None)."""
+    for m in reversed(sample.get("messages") or []):
+        if isinstance(m, dict) and m.get("role") == "user":
+            return m.get("content")
+    return None
+
+def validate_sample(sample):
+    """SFT 한 줄(dict) → (응답 dict, 오류코드 또는 None)."""
+    if not isinstance(sample, dict):
+        return None, "not_object"
+    msgs = sample.get("messages")
+    if not isinstance(msgs, list) or not msgs:
+        return None, "no_messages"
+    if any(not isinstance(m, dict) or m.get("role") not in ("system", "user", "assistant") or not isinstance(m.get("content"), str)
+           for m in msgs):
+        return None, "bad_message"
+    u = user_prompt(sample)
+    if not u or not u.strip():
+        return None, "empty_user"
+    return parse_response(sample.get("response"))
@@ -0,0 +1,202 @@
+# C:\dana\demo_dana\tools\validate_sft.py
+# SFT JSONL 검증 + 통계를 한 번의 병렬 패스로 계산 → JSON 리포트
+# - 각 줄: messages 구조, 라우팅 응답 스키마(routing_schema), JSON-only 여부 검사
+# - 라벨 분포(intent/action/jurisdiction/confidence), 프롬프트 길이 히스토그램
+# - 중복(같은 프롬프트 / 같은 샘플), train/val 프롬프트 겹침
+# - 파일을 줄 경계에 맞춘 바이트 구간으로 나눠 프로세스 풀에서 처리 (디스크 읽기 속도에 맞춤)
+#
+# 예) python tools\validate_sft.py                         (기본: data\sft 의 4개 파일)
+#     python tools\validate_sft.py a.jsonl b.jsonl --out report.json --strict
+import os, sys, json, time, hashlib, argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from routing_schema import validate_sample, user_prompt, FIELDS
+
+PROJECT_ROOT = r"C:\dana\demo_dana"
+SFT_DIR      = os.path.join(PROJECT_ROOT, r"data\sft")
+DEFAULT_FILES = [os.path.join(SFT_DIR, n) for n in
+                 ("train.jsonl", "val.jsonl", "train_mixed.jsonl", "summary_leftover.jsonl")]
+
+CHUNK_BYTES = 64 * 1024 * 1024
+LEN_BINS = [16, 32, 64, 128, 256, 512, 1024, 2048]   # 프롬프트 글자 수 구간 상한
+CONF_BINS = [0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+MAX_ERROR_SAMPLES = 20
+
+def _h(b):
+    return hashlib.blake2b(b, digest_size=8).digest()
+
+def _bucket(v, bins):
+    for i, edge in enumerate(bins):
+        if v <= edge:
+            return i
+    return len(bins)
+
+# ---------- 워커 ----------
+def scan_chunk(path, start, end):
+    """[start, end) 에서 *시작하는* 줄만 처리. 반환: 부분 통계 dict."""
+    st = {
+        "lines": 0, "blank": 0, "valid": 0,
+        "errors": Counter(), "error_samples": [],
+        "intent": Counter(), "action": Counter(), "jurisdiction": Counter(), "confidence": Counter(),
+        "len_hist": Counter(), "len_sum": 0, "len_max": 0,
+        "prompt_hashes": set(), "sample_hashes": set(), "n_prompts": 0,
+    }
+    with open(path, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+            if f.read(1) != b"\n":
+                f.readline()  # 앞 청크에 속한 줄의 나머지
+        pos = f.tell()
+        while pos < end:
+            raw = f.readline()
+            if not raw:
+                break
+            offset, pos = pos, pos + len(raw)
+            line = raw.strip()
+            if not line:
+                st["blank"] += 1
+                continue
+            st["lines"] += 1
+            st["sample_hashes"].add(_h(line))
+            try:
+                sample = json.loads(line)
+            except ValueError:
+                err, resp, sample = "invalid_line_json", None, None
+            else:
+                resp, err = validate_sample(sample)
+            u = user_prompt(sample) if isinstance(sample, dict) else None
+            if isinstance(u, str):
+                st["n_prompts"] += 1
+                st["prompt_hashes"].add(_h(u.strip().encode("utf-8")))
+                n = len(u)
+                st["len_hist"][_bucket(n, LEN_BINS)] += 1
+                st["len_sum"] += n
+                st["len_max"] = max(st["len_max"], n)
+            if err:
+                st["errors"][err] += 1
+                if len(st["error_samples"]) < MAX_ERROR_SAMPLES:
+                    st["error_samples"].append({"offset": offset, "error": err})
+                continue
+            st["valid"] += 1
+            for k in ("intent", "action", "jurisdiction"):
+                st[k][resp[k]] += 1
+            st["confidence"][_bucket(resp["confidence"], CONF_BINS)] += 1
+    return st
+
+# ---------- 병합 ----------
+def plan_chunks(path, chunk_bytes):
+    size = os.path.getsize(path)
+    return [(path, s, min(s + chunk_bytes, size)) for s in range(0, size, chunk_bytes)] or [(path, 0, 0)]
+
+def merge(parts):
+    out = None
+    for p in parts:
+        if out is None:
+            out = p
+            continue
+        for k in ("lines", "blank", "valid", "len_sum", "n_prompts"):
+            out[k] += p[k]
+        out["len_max"] = max(out["len_max"], p["len_max"])
+        for k in ("errors", "intent", "action", "jurisdiction", "confidence", "len_hist"):
+            out[k].update(p[k])
+        out["prompt_hashes"] |= p["prompt_hashes"]
+        out["sample_hashes"] |= p["sample_hashes"]
+        out["error_samples"] = (out["error_samples"] + p["error_samples"])[:MAX_ERROR_SAMPLES]
+    return out
+
+def _hist(counter, bins, fmt):
+    labels = [fmt(bins[0], None)] + [fmt(bins[i - 1], bins[i]) for i in range(1, len(bins))] + [fmt(bins[-1], "inf")]
+    return {labels[i]: counter.get(i, 0) for i in range(len(bins) + 1)}
+
+def file_report(path, st, seconds):
+    size = os.path.getsize(path)
+    lines = st["lines"]
+    return {
+        "path": path,
+        "bytes": size,
+        "lines": lines,
+        "blank_lines": st["blank"],
+        "valid": st["valid"],
+        "invalid": lines - st["valid"],
+        "invalid_rate": round((lines - st["valid"]) / lines, 6) if lines else 0.0,
+        "errors": dict(st["errors"].most_common()),
+        "error_samples": sorted(st["error_samples"], key=lambda e: e["offset"]),
+        "labels": {k: dict(st[k].most_common()) for k in ("intent", "action", "jurisdiction")},
+        "confidence_hist": _hist(st["confidence"], CONF_BINS,
+                                 lambda a, b: f"<={a}" if b is None else (f">{a}" if b == "inf" else f"({a},{b}]")),
+        "prompt_len": {
+            "mean": round(st["len_sum"] / st["n_prompts"], 2) if st["n_prompts"] else 0.0,
+            "max": st["len_max"],
+            "hist": _hist(st["len_hist"], LEN_BINS,
+                          lambda a, b: f"<={a}" if b is None else (f">{a}" if b == "inf" else f"({a},{b}]")),
+        },
+        "duplicates": {
+            "prompts": st["n_prompts"] - len(st["prompt_hashes"]),
+            "samples": lines - len(st["sample_hashes"]),
+        },
+        "seconds": round(seconds, 3),
+        "mb_per_s": round(size / 1e6 / seconds, 1) if seconds > 0 else None,
+    }
+
+def overlaps(paths, stats):
+    """이름에 'val' 이 들어간 파일 ↔ 나머지 파일의 프롬프트 겹침."""
+    out = {}
+    vals = [p for p in paths if "val" in os.path.basename(p).lower()]
+    others = [p for p in paths if p not in vals]
+    for v in vals:
+        for t in others:
+            shared = stats[v]["prompt_hashes"] & stats[t]["prompt_hashes"]
+            out[f"{os.path.basename(t)}&{os.path.basename(v)}"] = {
+                "prompts": len(shared),
+                "rate_of_val": round(len(shared) / len(stats[v]["prompt_hashes"]), 6) if stats[v]["prompt_hashes"] else 0.0,
+            }
+    return out
+
+# ---------- 실행 ----------
+def validate_files(paths, workers=None, chunk_bytes=CHUNK_BYTES):
+    tasks = [c for p in paths for c in plan_chunks(p, chunk_bytes)]
+    t0 = time.perf_counter()
+    parts = {p: [] for p in paths}
+    done_at = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futs = [(t[0], pool.submit(scan_chunk, *t)) for t in tasks]
+        for p, fut in futs:
+            parts[p].append(fut.result())
+            done_at[p] = time.perf_counter()
+    stats = {p: merge(parts[p]) for p in paths}
+    report = {
+        "schema": {"fields": list(FIELDS)},
+        "files": [file_report(p, stats[p], done_at[p] - t0) for p in paths],
+        "overlap": overlaps(paths, stats),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="*", help="검사할 JSONL (기본: data\\sft 의 train/val/train_mixed/summary_leftover)")
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_BYTES // (1024 * 1024), help="워커 작업 단위 (MB)")
+    parser.add_argument("--out", default=None, help="리포트 JSON 경로 (미지정 시 stdout)")
+    parser.add_argument("--strict", action="store_true", help="잘못된 줄이 하나라도 있으면 exit 1")
+    args = parser.parse_args()
+
+    paths = args.files or [p for p in DEFAULT_FILES if os.path.exists(p)]
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing or not paths:
+        print("[FATAL] file not found:", missing or DEFAULT_FILES, file=sys.stderr); sys.exit(1)
+
+    report = validate_files(paths, workers=args.workers, chunk_bytes=args.chunk_mb * 1024 * 1024)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fo:
+            fo.write(text + "\n")
+        print(f"[OK] wrote {args.out}", file=sys.stderr)
+    else:
+        print(text)
+    for fr in report["files"]:
+        print(f"[{os.path.basename(fr['path'])}] lines={fr['lines']} invalid={fr['invalid']} "
+              f"dup_prompts={fr['duplicates']['prompts']} {fr['mb_per_s']}MB/s", file=sys.stderr)
+    if args.strict and any(fr["invalid"] for fr in report["files"]):
+        sys.exit(1)
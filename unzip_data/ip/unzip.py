@@ -1,9 +1,14 @@
 import os
-import zipfile
+import sys
 import re
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from zip_extract import extract_archives
 
 SOURCE_DIR = "ip_legal_data"
 TARGET_DIR = "unzip_data/ip/dataset"
+STATE_PATH = os.path.join(TARGET_DIR, ".unzip_state.json")
 
 KIND_MAP = {
     "판결문": "judgment",
@@ -26,7 +31,8 @@ SPLIT_MAP = {
 
 ZIP_PATTERN = re.compile(r"^(TL|VL)_.*_(판결문|법령|심결례|심결문|유권해석).*_(질의응답|요약)\.zip$")
 
-def unzip_all():
+def unzip_all(workers=None, verify=False):
+    jobs = []
     for root, _, files in os.walk(SOURCE_DIR):
         for fname in files:
             if not fname.lower().endswith(".zip"):
@@ -44,14 +50,14 @@ def unzip_all():
             split = SPLIT_MAP.get(split_prefix, "other")
             
             extract_dir = os.path.join(TARGET_DIR, kind, form, split)
-            os.makedirs(extract_dir, exist_ok=True)
-            
-            try:
-                with zipfile.ZipFile(zip_path, 'r') as zf:
-                    zf.extractall(extract_dir)
-                print("✅ 해제 완료:", fname, "->", extract_dir)
-            except Exception as e:
-                print("❌ 해제 실패:", fname, "에러:", e)
+            jobs.append((zip_path, extract_dir))
+
+    # 아카이브/멤버 묶음 단위 병렬 해제, 크기+CRC 같은 파일과 완료된 아카이브는 건너뜀
+    extract_archives(jobs, STATE_PATH, workers=workers, verify=verify)
 
 if __name__ == "__main__":
-    unzip_all()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=None, help="해제 프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument("--verify", action="store_true", help="상태 파일 무시하고 모든 파일 크기/CRC 확인")
+    args = parser.parse_args()
+    unzip_all(workers=args.workers, verify=args.verify)
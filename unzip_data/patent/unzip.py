@@ -1,9 +1,14 @@
 import os
-import zipfile
+import sys
 import re
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from zip_extract import extract_archives
 
 SOURCE_DIR = "patent_data"
 TARGET_DIR = "unzip_data/patent/dataset"
+STATE_PATH = os.path.join(TARGET_DIR, ".unzip_state.json")
 
 # TS → train/val 구분은 파일명 안에 추가 패턴이 없으면 그냥 전부 train으로 둘게.
 # 만약 TS 안에서도 train/val 나눠야 한다면 파일명 규칙 알려줘야 함.
@@ -13,7 +18,8 @@ SPLIT_MAP = {
 
 ZIP_PATTERN = re.compile(r"^(TS)_.*\.zip$")
 
-def unzip_patent_data():
+def unzip_patent_data(workers=None, verify=False):
+    jobs = []
     for root, _, files in os.walk(SOURCE_DIR):
         for fname in files:
             if not fname.lower().endswith(".zip"):
@@ -31,14 +37,14 @@ def unzip_patent_data():
             # zip 이름 그대로 폴더 생성
             zip_stem = os.path.splitext(fname)[0]
             extract_dir = os.path.join(TARGET_DIR, split, zip_stem)
-            os.makedirs(extract_dir, exist_ok=True)
+            jobs.append((zip_path, extract_dir))
 
-            try:
-                with zipfile.ZipFile(zip_path, 'r') as zf:
-                    zf.extractall(extract_dir)
-                print("✅ 해제 완료:", fname, "->", extract_dir)
-            except Exception as e:
-                print("❌ 해제 실패:", fname, "에러:", e)
+    # 아카이브/멤버 묶음 단위 병렬 해제, 크기+CRC 같은 파일과 완료된 아카이브는 건너뜀
+    extract_archives(jobs, STATE_PATH, workers=workers, verify=verify)
 
 if __name__ == "__main__":
-    unzip_patent_data()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=None, help="해제 프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument("--verify", action="store_true", help="상태 파일 무시하고 모든 파일 크기/CRC 확인")
+    args = parser.parse_args()
+    unzip_patent_data(workers=args.workers, verify=args.verify)
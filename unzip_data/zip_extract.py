@@ -0,0 +1,155 @@
+import os
+import json
+import shutil
+import zlib
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# unzip_data/ip/unzip.py, unzip_data/patent/unzip.py 공용 해제 로직
+# - 아카이브 단위 + (큰 아카이브는) 멤버 묶음 단위로 프로세스 풀에서 병렬 해제
+# - 디스크에 이미 같은 크기 + CRC 의 파일이 있으면 그 멤버는 건너뜀
+# - 멤버는 zf.extract 대신 직접 기록: 여러 워커가 같은 상위 폴더를 동시에 만들 때
+#   zf.extract 내부 makedirs 가 FileExistsError(Errno 17) 로 실패하므로 exist_ok=True 로 생성
+# - 완료한 아카이브는 상태 파일에 (크기, mtime) 기록 → 재실행 시 아카이브 자체를 건너뜀
+
+CHUNK_BYTES = 256 * 1024 * 1024   # 작업 1개당 압축 해제 크기 상한
+CHUNK_FILES = 2000                # 작업 1개당 멤버 수 상한
+READ_BLOCK = 1024 * 1024
+
+
+def target_path(extract_dir, info):
+    """zipfile.ZipFile._extract_member 와 같은 규칙으로 해제 경로 계산."""
+    arcname = info.filename.replace("/", os.path.sep)
+    if os.path.altsep:
+        arcname = arcname.replace(os.path.altsep, os.path.sep)
+    arcname = os.path.splitdrive(arcname)[1]
+    invalid = ("", os.path.curdir, os.path.pardir)
+    arcname = os.path.sep.join(x for x in arcname.split(os.path.sep) if x not in invalid)
+    if os.path.sep == "\\":
+        arcname = zipfile.ZipFile._sanitize_windows_name(arcname, os.path.sep)
+    return os.path.join(extract_dir, arcname)
+
+
+def file_crc32(path):
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_BLOCK)
+            if not block:
+                return crc
+            crc = zlib.crc32(block, crc)
+
+
+def member_up_to_date(path, info):
+    try:
+        if os.path.getsize(path) != info.file_size:
+            return False
+    except OSError:
+        return False
+    return file_crc32(path) == info.CRC
+
+
+def extract_members(zip_path, extract_dir, names):
+    """(프로세스 풀 작업) names 멤버만 해제. 반환: (해제 수, 건너뜀 수, 해제 바이트)"""
+    extracted = skipped = nbytes = 0
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        for name in names:
+            info = zf.getinfo(name)
+            if info.is_dir():
+                os.makedirs(target_path(extract_dir, info), exist_ok=True)
+                continue
+            path = target_path(extract_dir, info)
+            if member_up_to_date(path, info):
+                skipped += 1
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with zf.open(info) as src, open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst, READ_BLOCK)
+            extracted += 1
+            nbytes += info.file_size
+    return extracted, skipped, nbytes
+
+
+def plan_chunks(zip_path):
+    """멤버를 CHUNK_BYTES / CHUNK_FILES 기준으로 묶음."""
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        infos = zf.infolist()
+    chunks, cur, cur_bytes = [], [], 0
+    for info in infos:
+        cur.append(info.filename)
+        cur_bytes += info.file_size
+        if cur_bytes >= CHUNK_BYTES or len(cur) >= CHUNK_FILES:
+            chunks.append(cur)
+            cur, cur_bytes = [], 0
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+
+def load_state(state_path):
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state_path, state):
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    tmp = state_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, state_path)
+
+
+def archive_stamp(zip_path, extract_dir):
+    st = os.stat(zip_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "extract_dir": extract_dir.replace("\\", "/")}
+
+
+def extract_archives(jobs, state_path, workers=None, verify=False):
+    """jobs: [(zip_path, extract_dir)] 를 병렬 해제.
+    verify=True 면 상태 파일을 무시하고 모든 멤버의 크기/CRC 를 확인."""
+    state = load_state(state_path)
+    pending = {}  # zip_path → [남은 작업 수, 해제, 건너뜀, 바이트, 실패 여부]
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {}
+        for zip_path, extract_dir in jobs:
+            fname = os.path.basename(zip_path)
+            key = zip_path.replace("\\", "/")
+            if not verify and state.get(key) == archive_stamp(zip_path, extract_dir):
+                print("⏭️ 변경 없음:", fname)
+                continue
+            try:
+                chunks = plan_chunks(zip_path)
+            except Exception as e:
+                print("❌ 해제 실패:", fname, "에러:", e)
+                continue
+            os.makedirs(extract_dir, exist_ok=True)
+            pending[zip_path] = [len(chunks), 0, 0, 0, False]
+            for names in chunks:
+                fut = pool.submit(extract_members, zip_path, extract_dir, names)
+                futures[fut] = (zip_path, extract_dir)
+            if not chunks:
+                futures[pool.submit(extract_members, zip_path, extract_dir, [])] = (zip_path, extract_dir)
+                pending[zip_path][0] = 1
+
+        for fut in as_completed(futures):
+            zip_path, extract_dir = futures[fut]
+            rec = pending[zip_path]
+            rec[0] -= 1
+            try:
+                n_ext, n_skip, nbytes = fut.result()
+                rec[1] += n_ext; rec[2] += n_skip; rec[3] += nbytes
+            except Exception as e:
+                rec[4] = True
+                print("❌ 해제 실패:", os.path.basename(zip_path), "에러:", e)
+            if rec[0] > 0:
+                continue
+            if rec[4]:
+                continue  # 일부 실패 → 상태 기록 안 함 (다음 실행에서 재시도)
+            state[zip_path.replace("\\", "/")] = archive_stamp(zip_path, extract_dir)
+            save_state(state_path, state)
+            print("✅ 해제 완료:", os.path.basename(zip_path), "->", extract_dir,
+                  f"(해제 {rec[1]}, 동일 파일 건너뜀 {rec[2]}, {rec[3] / 1e6:.1f}MB)")